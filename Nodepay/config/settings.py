@@ -22,14 +22,21 @@ class AppConfig:
     # Timing Configuration
     RETRY_INTERVAL = 30  # seconds
     DASHBOARD_UPDATE_INTERVAL = 1  # seconds
+    BANDWIDTH_SAVE_INTERVAL = 300  # seconds between bandwidth file writes
+    
+    # Metrics endpoint (enabled with --metrics-port)
+    METRICS_HOST = '127.0.0.1'
     
     # File Paths
     TOKEN_FILE = 'data/token.txt'
     PROXY_FILE = 'data/proxies.txt'
     LOG_FILE = 'data/sentinel.log'
+    BANDWIDTH_DIR = 'data/bandwidth'  # one JSON file of byte totals per day
     
     # HTTP Configuration
     USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
     
     # Cache Configuration
-    PROXY_CACHE_TTL = 2 * 60 * 60  # 2 hours in seconds
\ No newline at end of file
+    PROXY_CACHE_TTL = 2 * 60 * 60  # 2 hours in seconds
+    DNS_TTL = 300  # seconds an answer is reused
+    DNS_NEGATIVE_TTL = 30  # seconds a failed lookup is remembered
\ No newline at end of file
@@ -0,0 +1,194 @@
+import asyncio
+import aiohttp
+import json
+import os
+import socket
+import struct
+import time
+from collections import deque
+from datetime import date
+
+# tcpi_bytes_acked and tcpi_bytes_received in Linux's struct tcp_info (kernel 4.2+)
+TCP_INFO_BYTES = struct.Struct('=QQ')
+TCP_INFO_OFFSET = 120
+TCP_INFO_SIZE = 136
+
+def socket_bytes(transport):
+    """(sent, received) TCP payload bytes of the transport's socket, or None without TCP_INFO"""
+    if transport is None or not hasattr(socket, 'TCP_INFO'):
+        return None
+    sock = transport.get_extra_info('socket')
+    if sock is None:
+        return None
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, TCP_INFO_SIZE)
+    except OSError:
+        return None
+    if len(info) < TCP_INFO_SIZE:
+        return None
+    return TCP_INFO_BYTES.unpack_from(info, TCP_INFO_OFFSET)
+
+class CountingConnector(aiohttp.TCPConnector):
+    """TCP connector that keeps the transport of the last connection it opened
+
+    A response hands its connection back as soon as the body is read, so the
+    socket is picked up here rather than from the response.
+    """
+    last_transport = None
+
+    async def _create_connection(self, req, traces, timeout):
+        protocol = await super()._create_connection(req, traces, timeout)
+        self.last_transport = protocol.transport
+        return protocol
+
+    def take_transport(self):
+        """The last transport, cleared so a later failed request is not charged for it again"""
+        transport, self.last_transport = self.last_transport, None
+        return transport
+
+def http_bytes(response, request_body=0, response_body=0):
+    """(sent, received) for one HTTP exchange counted from its headers and bodies"""
+    request = response.request_info
+    sent = len(request.method) + len(request.url.raw_path_qs) + 12 + request_body + 2
+    sent += sum(len(name) + len(value) + 4 for name, value in request.headers.items())
+    received = 15 + len(response.reason or '') + response_body + 2
+    received += sum(len(name) + len(value) + 4 for name, value in response.raw_headers)
+    return sent, received
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+class BandwidthTracker:
+    """Bytes per proxy and per account by category, with rolling windows and a file per day
+
+    Every request opens a fresh connection, so on Linux the socket's own
+    counters give the exact bytes on the wire; whatever is not HTTP headers
+    and bodies is charged to 'handshake' (proxy CONNECT, TLS). Elsewhere
+    only the HTTP exchange is counted.
+    """
+    CATEGORIES = ('handshake', 'session', 'ping')
+
+    def __init__(self, directory='data/bandwidth', window_minutes=60):
+        self.directory = directory
+        self.index = {category: i * 2 for i, category in enumerate(self.CATEGORIES)}
+        self.day = date.today().isoformat()
+        self.totals = self._counters()
+        self.lifetime = self._counters()
+        self.proxies = {}
+        self.accounts = {}
+        self.minutes = deque(maxlen=window_minutes)  # [minute, counters]
+        self.finished = []  # reports of past days not written yet
+
+    def _counters(self):
+        return [0] * (len(self.CATEGORIES) * 2)
+
+    def add(self, proxy, account, category, sent, received):
+        if self.day != date.today().isoformat():
+            # The finished day is written off the loop by run(), or by save() on shutdown
+            self.finished.append(self.report())
+            self.roll_day()
+        index = self.index[category]
+        minute = int(time.time() // 60)
+        if not self.minutes or self.minutes[-1][0] != minute:
+            self.minutes.append([minute, self._counters()])
+        targets = [self.totals, self.lifetime, self.minutes[-1][1],
+                   self.proxies.setdefault(proxy or 'direct', self._counters())]
+        if account:
+            targets.append(self.accounts.setdefault(account, self._counters()))
+        for counters in targets:
+            counters[index] += sent
+            counters[index + 1] += received
+
+    def record_exchange(self, response, transport, proxy, account, category, request_body=0, response_body=0):
+        """Count one request/response; transport is the connection it went over"""
+        sent, received = http_bytes(response, request_body, response_body)
+        self.add(proxy, account, category, sent, received)
+        wire = socket_bytes(transport)
+        if wire is not None:
+            self.add(proxy, account, 'handshake', max(0, wire[0] - sent), max(0, wire[1] - received))
+
+    def record_failure(self, transport, proxy, account, category):
+        """Count a request that failed before a response could be read; only with TCP_INFO"""
+        wire = socket_bytes(transport)
+        if wire is not None:
+            self.add(proxy, account, category, *wire)
+
+    def window(self, minutes):
+        """Bytes in both directions over the last minutes"""
+        since = int(time.time() // 60) - minutes
+        return sum(sum(counters) for minute, counters in self.minutes if minute > since)
+
+    def share(self, category, minutes=60):
+        since = int(time.time() // 60) - minutes
+        index = self.index[category]
+        part = sum(counters[index] + counters[index + 1] for minute, counters in self.minutes if minute > since)
+        total = self.window(minutes)
+        return part / total if total else 0.0
+
+    def _by_category(self, counters):
+        return {category: counters[i:i + 2] for category, i in self.index.items()}
+
+    def report(self):
+        return {
+            'day': self.day,
+            'totals': self._by_category(self.totals),
+            'proxies': {proxy: self._by_category(c) for proxy, c in self.proxies.items()},
+            'accounts': {account: self._by_category(c) for account, c in self.accounts.items()}
+        }
+
+    def _path(self, day):
+        return os.path.join(self.directory, f'{day}.json')
+
+    def load(self):
+        """Continue today's totals after a restart"""
+        try:
+            with open(self._path(self.day), 'r') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        def counters(by_category):
+            values = self._counters()
+            for category, pair in by_category.items():
+                if category in self.index:
+                    values[self.index[category]:self.index[category] + 2] = pair
+            return values
+        self.totals = counters(report.get('totals', {}))
+        self.proxies = {proxy: counters(c) for proxy, c in report.get('proxies', {}).items()}
+        self.accounts = {account: counters(c) for account, c in report.get('accounts', {}).items()}
+
+    def _write(self, report):
+        path = self._path(report['day'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(report, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to save bandwidth totals: {str(e)}")
+
+    def save(self):
+        finished, self.finished = self.finished, []
+        for report in finished:
+            self._write(report)
+        self._write(self.report())
+
+    async def run(self, interval):
+        """Rewrite today's file every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            finished, self.finished = self.finished, []
+            for report in finished:
+                await asyncio.to_thread(self._write, report)
+            # The report is built on the loop; only the file write runs in a thread
+            await asyncio.to_thread(self._write, self.report())
+
+    def roll_day(self):
+        self.day = date.today().isoformat()
+        self.totals = self._counters()
+        self.proxies = {}
+        self.accounts = {}
@@ -0,0 +1,95 @@
+import asyncio
+import socket
+import time
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+class _DnsEntry:
+    __slots__ = ('addrs', 'error', 'expires', 'refresh_at')
+
+    def __init__(self, addrs, error, expires, refresh_at):
+        self.addrs = addrs
+        self.error = error  # (exception type, args) for a cached failure
+        self.expires = expires
+        self.refresh_at = refresh_at
+
+class DnsCache(AbstractResolver):
+    """Caching resolver shared by every session the monitor opens
+
+    Answers live for ttl seconds and failures for negative_ttl. Hits past
+    prefetch x ttl refresh the answer in the background, and concurrent
+    misses for one name share a single lookup. Lookups use aiohttp's
+    DefaultResolver (c-ares when aiodns is installed, threads otherwise).
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30, prefetch=0.8, max_entries=10000, resolver=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefetch = prefetch
+        self.max_entries = max_entries
+        self._resolver = resolver
+        self._entries = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        key = (host, port, family)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires:
+            self.hits += 1
+            if entry.error is not None:
+                error_type, args = entry.error
+                raise error_type(*args)
+            if now >= entry.refresh_at and key not in self._inflight:
+                self.prefetches += 1
+                self._lookup(key)
+            return entry.addrs
+
+        self.misses += 1
+        return await asyncio.shield(self._lookup(key))
+
+    def _lookup(self, key):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        return task
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # A failed prefetch has nobody awaiting it
+
+    async def _fetch(self, key):
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        host, port, family = key
+        try:
+            addrs = await self._resolver.resolve(host, port, family)
+        except OSError as e:
+            current = self._entries.get(key)
+            if current is not None and current.error is None and time.monotonic() < current.expires:
+                # Keep serving the still-valid answer and retry the prefetch later
+                current.refresh_at = time.monotonic() + self.negative_ttl
+                raise
+            self._store(key, _DnsEntry(None, (type(e), e.args), time.monotonic() + self.negative_ttl, float('inf')))
+            raise
+        now = time.monotonic()
+        self._store(key, _DnsEntry(addrs, None, now + self.ttl, now + self.ttl * self.prefetch))
+        return addrs
+
+    def _store(self, key, entry):
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            del self._entries[min(self._entries, key=lambda k: self._entries[k].expires)]
+        self._entries[key] = entry
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
@@ -0,0 +1,98 @@
+import asyncio
+from aiohttp import web
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(families):
+    """Format (name, kind, help, label_names, samples) families as Prometheus text"""
+    lines = []
+    for name, kind, help_text, label_names, samples in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for label_values, value in samples:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(label_names, label_values)} {_number(value)}')
+                continue
+            buckets, counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{name}_bucket{_labels(label_names, label_values, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, label_values)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(label_names, label_values)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def collect(monitor):
+    """Copy the monitor's stats into metric families"""
+    stats = monitor.stats
+    metrics = monitor.metrics
+    proxy_stats = [(host, dict(counts)) for host, counts in stats.get('proxy_stats', {}).items()]
+    bandwidth = monitor.bandwidth
+    return [
+        ('nodepay_pings_total', 'counter', 'Pings sent.', (),
+         [((), stats['total_pings'])]),
+        ('nodepay_ping_failures_total', 'counter', 'Pings where every endpoint failed.', (),
+         [((), stats['failed_pings'])]),
+        ('nodepay_retries_total', 'counter', 'Ping retries after a failure.', (),
+         [((), stats['retries'])]),
+        ('nodepay_active_sessions', 'gauge', 'Sessions currently pinging.', (),
+         [((), stats['active_sessions'])]),
+        ('nodepay_active_proxies', 'gauge', 'Proxies with a started session.', (),
+         [((), len(stats['active_proxies']))]),
+        ('nodepay_dns_lookups_total', 'counter', 'Shared DNS cache lookups by result.', ('result',),
+         [(('hit',), monitor.dns_cache.hits), (('miss',), monitor.dns_cache.misses),
+          (('prefetch',), monitor.dns_cache.prefetches)]),
+        ('nodepay_bytes_total', 'counter', 'Bytes exchanged by traffic category and direction.', ('category', 'direction'),
+         [((category, direction), bandwidth.lifetime[index + offset])
+          for category, index in bandwidth.index.items()
+          for offset, direction in enumerate(('sent', 'received'))]),
+        ('nodepay_session_start_seconds', 'histogram', 'Time to start a session.', (),
+         [((), metrics.session_latency.snapshot())]),
+        ('nodepay_ping_seconds', 'histogram', 'Round trip of successful pings.', (),
+         [((), metrics.ping_latency.snapshot())]),
+        ('nodepay_proxy_pings_total', 'counter', 'Pings per proxy.', ('proxy',),
+         [((host,), counts['total']) for host, counts in proxy_stats]),
+        ('nodepay_proxy_ping_success_total', 'counter', 'Successful pings per proxy.', ('proxy',),
+         [((host,), counts['success']) for host, counts in proxy_stats]),
+    ]
+
+class MetricsExporter:
+    """Serve /metrics in the Prometheus text format; rendering runs in a worker thread"""
+
+    def __init__(self, monitor, host='127.0.0.1', port=9110):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle(self, request):
+        families = collect(self.monitor)
+        body = await asyncio.to_thread(render, families)
+        return web.Response(body=body.encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,22 +1,50 @@
 import time
 import psutil
+from bisect import bisect_left
 from collections import deque
 from datetime import datetime, timedelta
 
+class Histogram:
+    """Fixed-bucket latency histogram in seconds"""
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """Copy of (buckets, per-bucket counts, sum, count)"""
+        return self.buckets, list(self.counts), self.sum, self.count
+
 class MetricsCollector:
     def __init__(self, max_history=1000):
         self.response_times = deque(maxlen=max_history)
         self.error_history = deque(maxlen=max_history)
         self.proxy_performance = {}
         self.start_time = datetime.now()
+        self.ping_latency = Histogram()
+        self.session_latency = Histogram()
 
     def add_response_time(self, duration, proxy_host=None):
+        """Record a ping round trip, in seconds"""
         self.response_times.append(duration)
+        self.ping_latency.observe(duration)
         if proxy_host:
             if proxy_host not in self.proxy_performance:
                 self.proxy_performance[proxy_host] = deque(maxlen=100)
             self.proxy_performance[proxy_host].append(duration)
 
+    def add_session_time(self, duration):
+        """Record a session start (the handshake), in seconds"""
+        self.session_latency.observe(duration)
+
     def get_system_metrics(self):
         process = psutil.Process()
         return {
@@ -27,4 +55,4 @@ class MetricsCollector:
         }
 
     def get_average_response_time(self):
-        return sum(self.response_times) / len(self.response_times) if self.response_times else 0
\ No newline at end of file
+        return sum(self.response_times) / len(self.response_times) if self.response_times else 0
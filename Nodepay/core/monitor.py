@@ -1,15 +1,24 @@
 import aiohttp
 import asyncio
+import json
+import time
 from datetime import datetime
 import secrets
 from colorama import Fore, Style
 from .proxy import ProxyManager
+from .metrics import MetricsCollector
+from .dns_cache import DnsCache
+from .bandwidth import BandwidthTracker, CountingConnector
 
 class SentinelMonitor:
-    def __init__(self, config, logger):
+    def __init__(self, config, logger, metrics=None):
         self.config = config
         self.logger = logger
         self.proxy_manager = ProxyManager(config, logger)
+        self.metrics = metrics or MetricsCollector()
+        # One resolver for every session so lookups are cached across pings and proxies
+        self.dns_cache = DnsCache(ttl=config.DNS_TTL, negative_ttl=config.DNS_NEGATIVE_TTL)
+        self.bandwidth = BandwidthTracker(config.BANDWIDTH_DIR)
         
         # Initialize statistics
         self.stats = {
@@ -22,7 +31,9 @@ class SentinelMonitor:
             'mode': None,
             'avg_response': 0,
             'memory_usage': 0,
-            'cpu_percent': 0
+            'cpu_percent': 0,
+            'active_sessions': 0,
+            'retries': 0
         }
         
         self.current_status = None
@@ -30,7 +41,9 @@ class SentinelMonitor:
     async def start_session(self, token, proxy=None):
         """Initialize session with token and optional proxy"""
         try:
+            started = time.monotonic()
             session_data = await self._get_session_data(token, proxy)
+            self.metrics.add_session_time(time.monotonic() - started)
             
             if proxy:
                 self.stats['active_proxies'].add(proxy['host'])
@@ -46,21 +59,34 @@ class SentinelMonitor:
         """Main bot operation loop"""
         try:
             session_data = await self.start_session(token, proxy)
+            self.stats['active_sessions'] += 1
             
-            while True:
-                try:
-                    await self._send_ping(session_data, token, proxy)
-                    await asyncio.sleep(self.config.RETRY_INTERVAL)
-                except Exception as e:
-                    self.logger.error(f"Ping failed: {str(e)}")
-                    await asyncio.sleep(5)  # Short delay before retry
+            try:
+                while True:
+                    try:
+                        await self._send_ping(session_data, token, proxy)
+                        await asyncio.sleep(self.config.RETRY_INTERVAL)
+                    except Exception as e:
+                        self.logger.error(f"Ping failed: {str(e)}")
+                        self.stats['retries'] += 1
+                        await asyncio.sleep(5)  # Short delay before retry
+            finally:
+                self.stats['active_sessions'] -= 1
                     
         except Exception as e:
             self.logger.error(f"Bot operation failed: {str(e)}")
 
+    def _client_session(self):
+        """HTTP session that resolves names through the shared DNS cache"""
+        connector = CountingConnector(resolver=self.dns_cache, use_dns_cache=False)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        await self.dns_cache.close()
+
     async def _get_session_data(self, token, proxy=None):
         """Get session data from API"""
-        async with aiohttp.ClientSession() as session:
+        async with self._client_session() as session:
             headers = {
                 'Authorization': f'Bearer {token}',
                 'User-Agent': self.config.USER_AGENT,
@@ -69,15 +95,31 @@ class SentinelMonitor:
             
             proxy_url = self.proxy_manager._build_url(proxy) if proxy else None
             
-            async with session.post(
-                self.config.SESSION_URL,
-                headers=headers,
-                proxy=proxy_url
-            ) as response:
-                if response.status != 200:
-                    raise Exception('Session request failed')
-                data = await response.json()
-                return data['data']
+            try:
+                async with session.post(
+                    self.config.SESSION_URL,
+                    headers=headers,
+                    proxy=proxy_url
+                ) as response:
+                    body = await response.read()
+            except Exception:
+                # No account is known yet; the bytes still count against the proxy
+                self.bandwidth.record_failure(
+                    session.connector.take_transport(), proxy['host'] if proxy else None, None, 'session'
+                )
+                raise
+
+            try:
+                data = json.loads(body)['data'] if response.status == 200 else None
+            except (ValueError, KeyError, TypeError):
+                data = None
+            self.bandwidth.record_exchange(
+                response, session.connector.take_transport(), proxy['host'] if proxy else None,
+                data.get('uid') if data else None, 'session', response_body=len(body)
+            )
+            if data is None:
+                raise Exception('Session request failed')
+            return data
 
     async def _send_ping(self, session_data, token, proxy=None):
         """Send ping to maintain connection with failover support"""
@@ -98,9 +140,10 @@ class SentinelMonitor:
         
         # Try each ping URL until one succeeds
         last_error = None
-        async with aiohttp.ClientSession() as session:
+        async with self._client_session() as session:
             for ping_url in self.config.PING_URLS:
                 try:
+                    started = time.monotonic()
                     async with session.post(
                         ping_url,
                         json=ping_data,
@@ -108,12 +151,24 @@ class SentinelMonitor:
                         proxy=proxy_url,
                         timeout=10  # Add timeout
                     ) as response:
+                        duration = time.monotonic() - started
+                        body = await response.read()
+                        # Counted whatever the status; a rejected ping still used the link
+                        self.bandwidth.record_exchange(
+                            response, session.connector.take_transport(), proxy['host'] if proxy else None, session_data['uid'],
+                            'ping', request_body=len(json.dumps(ping_data)), response_body=len(body)
+                        )
                         if response.status == 200:
+                            self.metrics.add_response_time(duration, proxy['host'] if proxy else None)
+                            self.stats['last_response_time'] = duration * 1000
                             self._update_stats(True, proxy)
                             self._set_success_status(session_data, proxy, ping_url)  # Add ping_url
                             return
                         
                 except Exception as e:
+                    self.bandwidth.record_failure(
+                        session.connector.take_transport(), proxy['host'] if proxy else None, session_data['uid'], 'ping'
+                    )
                     last_error = str(e)
                     self.logger.warning(f"Ping failed for {ping_url}: {str(e)}")
                     continue
@@ -10,15 +10,16 @@ from utils.cli import parse_arguments
 from config.validator import ConfigValidator
 from core.metrics import MetricsCollector
 from core.health import HealthChecker
+from core.exporter import MetricsExporter
 
 colorama.init()
 
 # Create logger at module level
 logger = setup_logger()
 
-async def initialize_bot():
+async def initialize_bot(metrics=None):
     """Initialize bot with configuration"""
-    return SentinelMonitor(AppConfig, logger)
+    return SentinelMonitor(AppConfig, logger, metrics)
 
 async def load_resources():
     """Load tokens and proxies"""
@@ -28,6 +29,8 @@ async def load_resources():
     return tokens, proxies
 
 async def main():
+    exporter = None
+    bot = None
     try:
         args = parse_arguments()
         config = ConfigValidator.validate_config(args.config)
@@ -41,7 +44,12 @@ async def main():
         mode = await show_menu()
         
         await loading_animation("Initializing system")
-        bot = await initialize_bot()
+        bot = await initialize_bot(metrics)
+        bot.bandwidth.load()
+        
+        if args.metrics_port:
+            exporter = MetricsExporter(bot, AppConfig.METRICS_HOST, args.metrics_port)
+            await exporter.start()
         
         # Set the mode in stats
         bot.stats['mode'] = mode
@@ -65,10 +73,12 @@ async def main():
         # Start dashboard update task
         async def update_dashboard():
             while True:
+                bot.stats['traffic_last_hour'] = bot.bandwidth.window(60)
                 render_dashboard(bot.stats, bot.current_status)
                 await asyncio.sleep(AppConfig.DASHBOARD_UPDATE_INTERVAL)
 
         tasks.append(asyncio.create_task(update_dashboard()))
+        tasks.append(asyncio.create_task(bot.bandwidth.run(AppConfig.BANDWIDTH_SAVE_INTERVAL)))
         
         await asyncio.gather(*tasks)
 
@@ -76,6 +86,12 @@ async def main():
         print(f"\n{Fore.GREEN}✓ Shutting down gracefully...{Style.RESET_ALL}")
     except Exception as e:
         print(f"\n{Fore.RED}✗ Fatal error: {str(e)}{Style.RESET_ALL}")
+    finally:
+        if exporter:
+            await exporter.stop()
+        if bot:
+            bot.bandwidth.save()
+            await bot.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
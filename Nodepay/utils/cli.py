@@ -14,4 +14,8 @@ def parse_arguments():
     parser.add_argument('--single',
                        action='store_true',
                        help='Force single token mode')
+    parser.add_argument('--metrics-port',
+                       type=int,
+                       default=None,
+                       help='Serve Prometheus metrics on this port')
     return parser.parse_args()
\ No newline at end of file
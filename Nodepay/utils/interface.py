@@ -3,6 +3,7 @@ import asyncio
 from datetime import datetime
 from colorama import Fore, Style
 import time
+from core.bandwidth import format_bytes
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -51,6 +52,7 @@ def render_dashboard(stats, status=None):
     print(f"{Fore.CYAN}│{Style.RESET_ALL} Success Rate  : {Fore.GREEN}{success_rate:.1f}%{Style.RESET_ALL}")
     print(f"{Fore.CYAN}│{Style.RESET_ALL} Failed Pings  : {Fore.RED}{stats['failed_pings']}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}│{Style.RESET_ALL} Active Proxies: {Fore.GREEN}{len(stats['active_proxies'])}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}│{Style.RESET_ALL} Traffic (1h)  : {Fore.YELLOW}{format_bytes(stats.get('traffic_last_hour', 0))}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}└──────────────────────────────────────────────┘{Style.RESET_ALL}")
 
     # Network Status
@@ -0,0 +1,189 @@
+"""Load benchmark for the getgrass connection path against local stand-ins.
+
+Runs N simulated (uid, proxy) pairs through the real Bot against
+benchmarks/stand_in.py and reports connections/sec, handshake latency
+percentiles, RSS per connection and CPU per message.
+
+    python benchmarks/run_benchmark.py --connections 500 --socks --duration 30
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import aiohttp
+from benchmarks.stand_in import run_stand_in
+from src.bot import Bot
+from src.config import Config
+from src.display_manager import DisplayManager
+from src.supervisor import TaskSupervisor
+from src.shutdown import graceful_shutdown
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is a high-water mark in kB on Linux, bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(values) -> dict:
+    return {f'p{p}': round(percentile(values, p) * 1000, 2) for p in (50, 90, 99)} | {
+        'max': round(max(values) * 1000, 2) if values else 0.0
+    }
+
+async def fetch_stats(session, port: int) -> dict:
+    async with session.get(f'http://127.0.0.1:{port}/stats') as response:
+        return await response.json()
+
+def build_bot(args, data_dir: str):
+    config = Config()
+    config.wss_scheme = 'ws'
+    config.wss_host = f'127.0.0.1:{args.port}'
+    config.wss_list = [config.wss_host]
+    config.ip_check_url = f'http://127.0.0.1:{args.port}/json'
+    config.ping_interval = args.ping_interval
+    config.data_dir = data_dir
+
+    display = DisplayManager()
+    display.error_log.path = os.path.join(data_dir, 'error.log')
+    bot = Bot(config, display)
+
+    # Client-side handshake timing around the real connection path
+    handshakes = []
+    connect = bot.create_websocket_connection
+
+    async def timed_connect(*a, **kw):
+        started = time.perf_counter()
+        result = await connect(*a, **kw)
+        handshakes.append(time.perf_counter() - started)
+        return result
+
+    bot.create_websocket_connection = timed_connect
+    return bot, display, handshakes
+
+def build_pairs(args) -> list:
+    if not args.socks:
+        return [(f'bench-uid-{i}', None) for i in range(args.connections)]
+    # Distinct credentials make every proxy a separate registry/breaker key
+    proxy_count = max(1, args.connections // args.uids)
+    proxies = [f'socks5://bench{i}:x@127.0.0.1:{args.socks_port}' for i in range(proxy_count)]
+    uids = [f'bench-uid-{i}' for i in range(args.uids)]
+    return [(uid, proxy) for uid in uids for proxy in proxies][:args.connections]
+
+async def run(args) -> dict:
+    data_dir = tempfile.mkdtemp(prefix='getgrass-bench-')
+    bot, display, handshakes = build_bot(args, data_dir)
+    pairs = build_pairs(args)
+    supervisor = TaskSupervisor()
+
+    async with aiohttp.ClientSession() as stats_session:
+        baseline = await fetch_stats(stats_session, args.port)
+        rss_start = rss_bytes()
+        started = time.perf_counter()
+        for key in pairs:
+            supervisor.start(key, bot.connection_factory(key))
+        display.expect_connections(len(pairs))
+
+        # Ramp: wait until every pair has answered AUTH, or give up at the timeout
+        authed = 0
+        while time.perf_counter() - started < args.connect_timeout:
+            stats = await fetch_stats(stats_session, args.port)
+            authed = stats['authed'] - baseline['authed']
+            if authed >= len(pairs):
+                break
+            await asyncio.sleep(0.2)
+        ramp_time = time.perf_counter() - started
+        rss_connected = rss_bytes()
+
+        # Steady state: bill client CPU to the messages exchanged in the window
+        before = await fetch_stats(stats_session, args.port)
+        cpu_before = time.process_time()
+        await asyncio.sleep(args.duration)
+        cpu_used = time.process_time() - cpu_before
+        after = await fetch_stats(stats_session, args.port)
+
+    drained = await graceful_shutdown(bot, supervisor, bot.config.shutdown_timeout)
+    await display.error_log.close()
+
+    messages = (after['messages_in'] + after['messages_out']) - (before['messages_in'] + before['messages_out'])
+    return {
+        'pairs': len(pairs),
+        'mode': 'socks5' if args.socks else 'direct',
+        'connected': authed,
+        'ramp_seconds': round(ramp_time, 3),
+        'fully_connected_seconds': round(display.stats.fully_connected_after or 0, 3),
+        'handshake_limit': bot.admission.limit,
+        'connections_per_second': round(authed / ramp_time, 2) if ramp_time else 0.0,
+        'handshake_ms': latency_summary(handshakes),
+        'server_auth_ms': latency_summary(after['auth_latencies'][baseline['authed']:]),
+        'phase_ms': {
+            phase: {'p50': round(summary['p50'] * 1000, 2), 'p90': round(summary['p90'] * 1000, 2)}
+            for phase, summary in display.phases.report()['phases'].items()
+        },
+        'rss_per_connection_kb': round((rss_connected - rss_start) / max(1, authed) / 1024, 2),
+        'steady_messages': messages,
+        'cpu_us_per_message': round(cpu_used / messages * 1e6, 2) if messages else None,
+        'errors': display.failed_pings,
+        'shutdown_seconds': drained['seconds'],
+        'shutdown_aborted': drained['aborted']
+    }
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='getgrass connection benchmark')
+    parser.add_argument('-n', '--connections', type=int, default=100)
+    parser.add_argument('--uids', type=int, default=1, help='uids sharing each proxy in SOCKS mode')
+    parser.add_argument('--socks', action='store_true', help='route through the local SOCKS5 stand-in')
+    parser.add_argument('--duration', type=float, default=20, help='steady-state seconds measured')
+    parser.add_argument('--connect-timeout', type=float, default=120)
+    parser.add_argument('--ping-interval', type=float, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socks-port', type=int, default=1081)
+    parser.add_argument('--json', help='also write the report to this file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Event()
+    stand_in = ctx.Process(
+        target=run_stand_in,
+        args=('127.0.0.1', args.port, args.socks_port if args.socks else None, ready),
+        daemon=True
+    )
+    stand_in.start()
+    try:
+        if not ready.wait(15):
+            raise RuntimeError('stand-in server did not start')
+        # Bot logs every AUTH/PONG to stdout; keep that out of the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            report = asyncio.run(run(args))
+    finally:
+        stand_in.terminate()
+        stand_in.join(5)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == '__main__':
+    main()
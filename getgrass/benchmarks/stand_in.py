@@ -0,0 +1,163 @@
+"""Local stand-ins for the getgrass WebSocket endpoint, the IP check service and a SOCKS5 proxy.
+
+The WebSocket side speaks the subset of the protocol Bot.handle_websocket
+expects: it sends AUTH on connect, records the AUTH response and answers
+every PING with a PONG. GET /json mimics ipinfo.io and GET /stats returns
+the server's counters.
+"""
+import asyncio
+import json
+import struct
+import time
+import uuid
+from aiohttp import web, WSMsgType
+
+class ProtocolServer:
+    def __init__(self):
+        self.connections = 0
+        self.active = 0
+        self.authed = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.auth_latencies = []  # seconds from upgrade to AUTH response
+        self.started = time.monotonic()
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse(autoping=True)
+        opened = time.monotonic()
+        await ws.prepare(request)
+        self.connections += 1
+        self.active += 1
+        try:
+            auth_id = str(uuid.uuid4())
+            await ws.send_json({'id': auth_id, 'action': 'AUTH', 'data': {}})
+            self.messages_out += 1
+
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                self.messages_in += 1
+                message = json.loads(msg.data)
+                if message.get('origin_action') == 'AUTH' and message.get('id') == auth_id:
+                    self.authed += 1
+                    self.auth_latencies.append(time.monotonic() - opened)
+                elif message.get('action') == 'PING':
+                    await ws.send_json({'id': message.get('id'), 'origin_action': 'PONG', 'action': 'PONG'})
+                    self.messages_out += 1
+        finally:
+            self.active -= 1
+        return ws
+
+    async def ip_info(self, request):
+        return web.json_response({'ip': request.remote or '127.0.0.1', 'city': 'Local', 'org': 'stand-in'})
+
+    async def stats(self, request):
+        return web.json_response({
+            'connections': self.connections,
+            'active': self.active,
+            'authed': self.authed,
+            'messages_in': self.messages_in,
+            'messages_out': self.messages_out,
+            'auth_latencies': self.auth_latencies,
+            'uptime': time.monotonic() - self.started
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', self.websocket)
+        app.router.add_get('/json', self.ip_info)
+        app.router.add_get('/stats', self.stats)
+        return app
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def handle_socks5(reader, writer):
+    """Minimal SOCKS5 CONNECT with optional username/password auth (RFC 1928/1929)."""
+    try:
+        version, nmethods = await reader.readexactly(2)
+        methods = await reader.readexactly(nmethods)
+        if version != 5:
+            writer.close()
+            return
+
+        if 2 in methods:
+            writer.write(b'\x05\x02')
+            await writer.drain()
+            _, ulen = await reader.readexactly(2)
+            await reader.readexactly(ulen)
+            plen = (await reader.readexactly(1))[0]
+            await reader.readexactly(plen)
+            writer.write(b'\x01\x00')  # Any credentials are accepted
+        else:
+            writer.write(b'\x05\x00')
+        await writer.drain()
+
+        _, cmd, _, atyp = await reader.readexactly(4)
+        if atyp == 1:
+            host = '.'.join(str(b) for b in await reader.readexactly(4))
+        elif atyp == 3:
+            length = (await reader.readexactly(1))[0]
+            host = (await reader.readexactly(length)).decode()
+        else:
+            writer.write(b'\x05\x08\x00\x01' + bytes(6))
+            writer.close()
+            return
+        port = struct.unpack('!H', await reader.readexactly(2))[0]
+
+        if cmd != 1:
+            writer.write(b'\x05\x07\x00\x01' + bytes(6))
+            writer.close()
+            return
+
+        upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        writer.write(b'\x05\x00\x00\x01' + bytes(6))
+        await writer.drain()
+        await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer))
+    except (asyncio.IncompleteReadError, ConnectionError, OSError):
+        writer.close()
+
+async def serve(host: str, ws_port: int, socks_port: int = None, ready=None):
+    server = ProtocolServer()
+    runner = web.AppRunner(server.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, ws_port, backlog=4096).start()
+
+    socks_server = None
+    if socks_port:
+        socks_server = await asyncio.start_server(handle_socks5, host, socks_port, backlog=4096)
+
+    if ready is not None:
+        ready.set()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if socks_server:
+            socks_server.close()
+        await runner.cleanup()
+
+def run_stand_in(host: str, ws_port: int, socks_port: int = None, ready=None):
+    """Process entry point so the stand-in's CPU is not billed to the bot under test."""
+    try:
+        asyncio.run(serve(host, ws_port, socks_port, ready))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='getgrass protocol stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socks-port', type=int, default=None)
+    args = parser.parse_args()
+    run_stand_in(args.host, args.port, args.socks_port)
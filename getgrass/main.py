@@ -1,11 +1,23 @@
 import asyncio
 import os
+import signal
+import sys
 from rich.live import Live
 from rich.console import Console
 from src.bot import Bot
 from src.config import Config
-from src.proxy_manager import read_lines, auto_detect_proxy_source
+from src.proxy_manager import read_lines, auto_detect_proxy_source, parse_proxy_line, parse_uid_line, SourceWatcher
 from src.display_manager import DisplayManager
+from src.supervisor import TaskSupervisor, RestartPolicy
+from src.sharded_runner import ShardCoordinator
+from src.cli import parse_arguments
+from src.snapshot_writer import SnapshotWriter
+from src.metrics_server import MetricsServer, collect
+from src.shutdown import graceful_shutdown, install_signal_handlers
+from src.phase_timing import PhaseReportWriter
+from src.bandwidth import BandwidthWriter
+from src.proxy_state import ProxyStateSnapshot
+from src.profiling import RuntimeProfile
 from datetime import datetime
 from colorama import Fore
 
@@ -24,22 +36,150 @@ def setup_sync():
 async def setup_async(proxy_source):
     proxies = []
     if proxy_source['type'] == 'file':
-        proxies = await read_lines(proxy_source['source'])
+        proxies = await read_lines(proxy_source['source'], parse_proxy_line)
         if not proxies:
             console.print("[red]No proxies found in the proxy file. Switching to direct connection...")
             proxy_source['type'] = 'none'
     
-    user_ids = await read_lines('data/uid.txt')
+    user_ids = await read_lines('data/uid.txt', parse_uid_line)
     if not user_ids:
         console.print("[red]No user IDs found in data/uid.txt. Exiting...")
         return None, None
 
     return proxies, user_ids
 
+def start_view(display_manager, args):
+    """Start the Live TUI, or the JSON-lines snapshot writer in headless mode."""
+    if args.headless:
+        writer = SnapshotWriter(display_manager, args.stats_output, args.stats_interval)
+        return writer, asyncio.create_task(writer.run())
+
+    # Rendering is driven by display_manager.run_renderer, not Live's refresh thread
+    live = Live(
+        display_manager.generate_layout(),
+        auto_refresh=False,
+        screen=True,
+        console=Console()
+    )
+    live.start()
+    return live, asyncio.create_task(display_manager.run_renderer(live, refresh_per_second=4))
+
+async def start_metrics(display_manager, args, bot=None, coordinator=None):
+    if args.metrics_port is None:
+        return None
+    server = MetricsServer(
+        lambda: collect(display_manager, bot, coordinator), args.metrics_host, args.metrics_port
+    )
+    await server.start()
+    return server
+
+def start_phase_report(display_manager, config):
+    """Rewrite data/connection_phases.json with per-phase connect timings every interval."""
+    writer = PhaseReportWriter(
+        display_manager.phases,
+        os.path.join(DATA_DIR, 'connection_phases.json'),
+        config.phase_report_interval
+    )
+    return writer, asyncio.create_task(writer.run())
+
+def start_bandwidth(display_manager, config):
+    """Continue today's byte counters from data/bandwidth/ and keep saving them."""
+    writer = BandwidthWriter(
+        display_manager.bandwidth,
+        os.path.join(DATA_DIR, 'bandwidth'),
+        config.bandwidth_save_interval
+    )
+    writer.load()
+    return writer, asyncio.create_task(writer.run())
+
+def start_proxy_state(display_manager, config, health_source, proxies):
+    """Restore per-proxy counters from data/proxy_state.json and keep it saved; returns the breaker states to resume."""
+    snapshot = ProxyStateSnapshot(
+        display_manager.stats,
+        health_source,
+        os.path.join(DATA_DIR, 'proxy_state.json'),
+        config.proxy_state_interval,
+        config.proxy_state_max_age
+    )
+    health = snapshot.load(proxies)
+    if health:
+        backing_off = sum(1 for state in health.values() if state['open_until'])
+        display_manager.add_activity({
+            'time': datetime.now(),
+            'success': True,
+            'message': f'Restored state for {len(health)} proxies, {backing_off} starting in backoff',
+            'status': 'Restored'
+        })
+    return snapshot, health, asyncio.create_task(snapshot.run())
+
+def start_profiling(display_manager, profile, on_signal=None):
+    """SIGUSR1 toggles a sampling profile of this process; progress shows in the activity panel."""
+    def on_event(message):
+        display_manager.add_activity({
+            'time': datetime.now(),
+            'success': True,
+            'message': message,
+            'status': 'Profiling'
+        })
+    return profile.install_profiler(on_event, on_signal)
+
+async def run_sharded(display_manager, pairs, args, config, profile):
+    """Run connections in worker processes; this process only aggregates and renders."""
+    coordinator = ShardCoordinator(display_manager, args.workers, profile, log_to_stderr=args.headless)
+    # The coordinator passes SIGUSR1 on, so one signal profiles every worker of the fleet
+    start_profiling(display_manager, profile, lambda: coordinator.signal_workers(signal.SIGUSR1))
+    view = None
+    render_task = None
+    metrics = None
+    phase_report, phase_task = start_phase_report(display_manager, config)
+    bandwidth, bandwidth_task = start_bandwidth(display_manager, config)
+    proxy_state, health, proxy_state_task = start_proxy_state(
+        display_manager, config, coordinator.health_states, [proxy for _, proxy in pairs if proxy]
+    )
+    try:
+        view, render_task = start_view(display_manager, args)
+        metrics = await start_metrics(display_manager, args, coordinator=coordinator)
+        display_manager.expect_connections(len(pairs))
+        started = coordinator.start(pairs, health)
+        display_manager.add_activity({
+            'time': datetime.now(),
+            'success': True,
+            'message': f'Started {started} worker processes for {len(pairs)} connections',
+            'status': 'Starting'
+        })
+        # Workers run until interrupted
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        console.print("\n[yellow]Stopping bot...")
+    finally:
+        display_manager.is_running = False
+        if render_task:
+            render_task.cancel()
+        await coordinator.stop()
+        phase_task.cancel()
+        phase_report.save()
+        bandwidth_task.cancel()
+        bandwidth.save()
+        # Workers send their final breaker states before exiting
+        proxy_state_task.cancel()
+        proxy_state.save()
+        if metrics:
+            await metrics.stop()
+        await display_manager.error_log.close()
+        if view:
+            view.stop()
+
 async def main():
     try:
-        # Clear the screen before starting
-        os.system('clear' if os.name == 'posix' else 'cls')
+        args = parse_arguments()
+        install_signal_handlers()
+
+        if args.headless:
+            # No terminal to draw on; keep stdout for the JSON-lines stats and log to stderr
+            sys.stdout = sys.stderr
+        else:
+            # Clear the screen before starting
+            os.system('clear' if os.name == 'posix' else 'cls')
         
         proxy_source = setup_sync()
         proxies, user_ids = await setup_async(proxy_source)
@@ -48,21 +188,86 @@ async def main():
 
         display_manager = DisplayManager()
         display_manager.total_proxies = len(proxies) if proxy_source['type'] != 'none' else 1
-        
         config = Config()
+        # Lean by default; --debug turns on asyncio debug mode with a slow-callback threshold
+        profile = RuntimeProfile(
+            DATA_DIR,
+            debug=args.debug,
+            slow_callback=args.slow_callback,
+            profile_seconds=args.profile_seconds
+        )
+        profile.apply(asyncio.get_running_loop())
+
+        if args.workers > 1:
+            active_proxies = proxies if proxy_source['type'] != 'none' else []
+            pairs = [(user_id, proxy) for user_id in user_ids for proxy in active_proxies or [None]]
+            await run_sharded(display_manager, pairs, args, config, profile)
+            return
+        
         bot = Bot(config, display_manager)
+        start_profiling(display_manager, profile)
+
+        def on_task_crash(key, exception, crash_count):
+            user_id, proxy = key
+            display_manager.record_task_crash(f"Task failed ({crash_count}x) for {proxy or 'direct'}: {str(exception)}", proxy)
 
-        # Create the Live display
-        live = Live(
-            display_manager.generate_layout(),
-            refresh_per_second=4,
-            screen=True,
-            console=Console()
+        def on_task_give_up(key, exception, crash_count):
+            user_id, proxy = key
+            display_manager.record_lost_connections(
+                1, f"Gave up on {proxy or 'direct'} after {crash_count} crashes: {str(exception)}", proxy
+            )
+
+        supervisor = TaskSupervisor(
+            RestartPolicy(mode='on-failure', delay=config.task_restart_delay),
+            on_crash=on_task_crash,
+            on_give_up=on_task_give_up
         )
 
-        tasks = []
+        def on_sources_changed(added, removed):
+            # Drain only the pairs that disappeared and start only the new ones
+            for key in removed:
+                supervisor.stop(key)
+            for key in added:
+                supervisor.start(key, bot.connection_factory(key))
+            display_manager.total_proxies = len(watcher.proxies) or 1
+            display_manager.expect_connections(supervisor.running)
+            display_manager.add_activity({
+                'time': datetime.now(),
+                'success': True,
+                'message': f'Reloaded sources: +{len(added)} / -{len(removed)} connections',
+                'status': 'Reloaded'
+            })
+
+        def on_source_event(message):
+            display_manager.add_activity({
+                'time': datetime.now(),
+                'success': False,
+                'message': message,
+                'status': 'Reload'
+            })
+
+        watcher = SourceWatcher(
+            on_sources_changed,
+            proxy_file=proxy_source.get('source', 'data/proxy.txt'),
+            interval=config.source_reload_interval,
+            on_event=on_source_event
+        )
+        view = None
+        render_task = None
+        watcher_task = None
+        metrics = None
+        active_proxies = proxies if proxy_source['type'] != 'none' else []
+        phase_report, phase_task = start_phase_report(display_manager, config)
+        bandwidth, bandwidth_task = start_bandwidth(display_manager, config)
+        # Proxies that were failing before the restart resume their breakers instead of being retried blind
+        proxy_state, health, proxy_state_task = start_proxy_state(
+            display_manager, config, bot.proxy_health.export, active_proxies
+        )
+        bot.proxy_health.restore(health)
         try:
-            live.start()
+            view, render_task = start_view(display_manager, args)
+            metrics = await start_metrics(display_manager, args, bot)
+            live = view if isinstance(view, Live) else None
             bot.live = live
             
             # Debug log
@@ -74,59 +279,53 @@ async def main():
             })
             display_manager.update_display(live)
 
-            # Create tasks for each proxy and user ID combination
+            # Create supervised tasks for each proxy and user ID combination
             for user_id in user_ids:
-                if proxy_source['type'] != 'none':
-                    for proxy in proxies:
-                        task = asyncio.create_task(bot.connect_with_proxy(proxy, user_id))
-                        tasks.append(task)
-                else:
-                    task = asyncio.create_task(bot.connect_directly(user_id))
-                    tasks.append(task)
+                for proxy in active_proxies or [None]:
+                    supervisor.start((user_id, proxy), bot.connection_factory((user_id, proxy)))
+            display_manager.expect_connections(supervisor.running)
+
+            # Pick up edits to proxy.txt / uid.txt without restarting unchanged connections
+            watcher.prime(user_ids, active_proxies)
+            watcher_task = asyncio.create_task(watcher.run())
 
             display_manager.add_activity({
                 'time': datetime.now(),
                 'success': True,
-                'message': f'Created {len(tasks)} connection tasks',
+                'message': f'Created {supervisor.running} connection tasks',
                 'status': 'Starting'
             })
             display_manager.update_display(live)
 
-            # Keep running until interrupted
-            while display_manager.is_running:
-                # Update display
-                display_manager.update_display(live)
-                
-                # Wait for any completed tasks
-                done, pending = await asyncio.wait(
-                    tasks, 
-                    timeout=1,
-                    return_when=asyncio.FIRST_COMPLETED
-                )
-                
-                # Check for failed tasks
-                for task in done:
-                    if task.exception():
-                        display_manager.add_error(f"Task failed: {str(task.exception())}")
-                        # Recreate failed tasks
-                        tasks = [t for t in tasks if t not in done]
-                        tasks.extend(pending)
-                
-                # Short sleep to prevent CPU overuse
-                await asyncio.sleep(0.1)
+            # The supervisor restarts crashed tasks itself; just wait until shutdown
+            await supervisor.wait_closed()
 
         except asyncio.CancelledError:
             display_manager.is_running = False
             console.print("\n[yellow]Stopping bot...")
         finally:
             display_manager.is_running = False
-            # Cancel all remaining tasks
-            for task in tasks:
-                if not task.done():
-                    task.cancel()
-            # Wait for tasks to complete cancellation
-            await asyncio.gather(*tasks, return_exceptions=True)
-            live.stop()
+            if render_task:
+                render_task.cancel()
+            if watcher_task:
+                watcher_task.cancel()
+            # Close every socket at once under one deadline, then flush caches and logs
+            drained = await graceful_shutdown(bot, supervisor, config.shutdown_timeout)
+            phase_task.cancel()
+            phase_report.save()
+            bandwidth_task.cancel()
+            bandwidth.save()
+            proxy_state_task.cancel()
+            proxy_state.save()
+            if metrics:
+                await metrics.stop()
+            await display_manager.error_log.close()
+            if view:
+                view.stop()
+            console.print(
+                f"[yellow]Closed {drained['closed']} connections, aborted {drained['aborted']} "
+                f"in {drained['seconds']}s"
+            )
 
     except Exception as e:
         console.print(f"[red]Setup error: {str(e)}")
@@ -135,7 +334,6 @@ async def main():
 if __name__ == "__main__":
     try:
         loop = asyncio.get_event_loop()
-        loop.set_debug(True)
         loop.run_until_complete(main())
     except KeyboardInterrupt:
         console.print("\n[yellow]Bot stopped by user")
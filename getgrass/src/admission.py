@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import deque
+
+class AdmissionController:
+    """Adaptive cap on concurrent handshakes (IP check plus WebSocket upgrade).
+
+    Starting every uid x proxy pair at once makes thousands of SOCKS and TLS
+    handshakes compete for the same second and most of them time out. The
+    controller admits a small batch first and re-evaluates once per window:
+    while handshakes succeed and the loop keeps up, the limit doubles (and
+    grows by a quarter after the first cut); when the success rate falls
+    below its running baseline or loop lag exceeds max_lag, it is halved.
+    While held (load shedding), new handshakes queue and in-flight ones finish.
+    """
+
+    def __init__(self, initial_limit: int = 32, min_limit: int = 8, max_limit: int = 1024,
+                 window: float = 2.0, max_lag: float = 0.2, tolerance: float = 0.15,
+                 min_samples: int = 8, lag_monitor=None):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.max_lag = max_lag
+        self.tolerance = tolerance  # allowed drop below the baseline success rate
+        self.min_samples = min_samples
+        self.lag_monitor = lag_monitor
+        self.in_flight = 0
+        self.baseline = None  # smoothed success rate of healthy windows
+        self.cuts = 0
+        self.held = False
+        self._waiters = deque()
+        self._slow_start = True
+        self._window_started = time.monotonic()
+        self._ok = 0
+        self._failed = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.lag_monitor:
+            self.lag_monitor.start()
+        if not self.held and self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancel landed; pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, success: bool):
+        if success:
+            self._ok += 1
+        else:
+            self._failed += 1
+        self.in_flight = max(0, self.in_flight - 1)
+        self._maybe_adjust()
+        self._wake()
+
+    def hold(self, held: bool):
+        if held != self.held:
+            self.held = held
+            if not held:
+                self._wake()
+
+    def _wake(self):
+        while not self.held and self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _maybe_adjust(self):
+        now = time.monotonic()
+        if now - self._window_started < self.window:
+            return
+
+        total = self._ok + self._failed
+        rate = self._ok / total if total else None
+        lag = self.lag_monitor.lag if self.lag_monitor else 0.0
+        degraded = (
+            rate is not None and total >= self.min_samples and self.baseline is not None
+            and rate < self.baseline - self.tolerance
+        )
+
+        if lag > self.max_lag or degraded:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._slow_start = False
+            self.cuts += 1
+        elif self._ok:
+            if total >= self.min_samples:
+                self.baseline = rate if self.baseline is None else self.baseline + (rate - self.baseline) * 0.2
+            # Only grow while handshakes are actually queueing for a slot
+            if self._waiters:
+                step = self.limit if self._slow_start else max(1, self.limit // 4)
+                self.limit = min(self.max_limit, self.limit + step)
+
+        self._window_started = now
+        self._ok = 0
+        self._failed = 0
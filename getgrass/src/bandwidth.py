@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from collections import deque
+from datetime import date
+
+# Traffic categories; every counter is a flat [sent, received] pair per category
+CATEGORIES = ('handshake', 'ping', 'pong', 'auth', 'messages', 'http', 'overhead')
+_INDEX = {category: index * 2 for index, category in enumerate(CATEGORIES)}
+
+# tcpi_bytes_acked and tcpi_bytes_received in Linux's struct tcp_info (kernel 4.2+)
+_TCP_INFO_BYTES = struct.Struct('=QQ')
+_TCP_INFO_OFFSET = 120
+_TCP_INFO_SIZE = 136
+
+def socket_bytes(transport):
+    """(sent, received) TCP payload bytes of the transport's socket, or None without TCP_INFO."""
+    if transport is None or not hasattr(socket, 'TCP_INFO'):
+        return None
+    sock = transport.get_extra_info('socket')
+    if sock is None:
+        return None
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, _TCP_INFO_SIZE)
+    except OSError:
+        return None
+    if len(info) < _TCP_INFO_SIZE:
+        return None
+    return _TCP_INFO_BYTES.unpack_from(info, _TCP_INFO_OFFSET)
+
+def ws_frame_size(payload: int, masked: bool) -> int:
+    """Bytes on the wire for a WebSocket frame; client frames carry a 4-byte mask."""
+    header = 2 if payload < 126 else (4 if payload < 65536 else 10)
+    return payload + header + (4 if masked else 0)
+
+def format_bytes(count: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+def _header_bytes(headers) -> int:
+    return sum(len(name) + len(value) + 4 for name, value in headers) + 2
+
+def http_bytes(response, body_size: int = 0) -> tuple:
+    """(sent, received) for one HTTP exchange from its headers; request bodies are not counted."""
+    request = response.request_info
+    request_line = len(request.method) + len(request.url.raw_path_qs) + 12  # 'GET /path HTTP/1.1\r\n'
+    sent = request_line + _header_bytes(request.headers.items())
+    received = 15 + len(response.reason or '') + _header_bytes(response.raw_headers) + body_size
+    return sent, received
+
+class ConnectionTraffic:
+    """Bytes of one WebSocket connection, reported to a ledger as they happen.
+
+    Frames are counted by category when sent or received. Where the socket
+    exposes TCP_INFO, everything on the wire up to the end of the upgrade
+    (SOCKS, TLS, HTTP) counts as handshake, and whatever the socket carried
+    beyond the counted frames (TLS records, control frames) as overhead.
+    Without TCP_INFO the handshake is the HTTP upgrade alone.
+    """
+
+    __slots__ = ('record', 'proxy', 'account', 'transport', '_wire', '_counted', '_overhead')
+
+    def __init__(self, record, proxy: str, account: str):
+        self.record = record  # record(proxy, account, category, sent, received)
+        self.proxy = proxy
+        self.account = account
+        self.transport = None
+        self._wire = None
+        self._counted = [0, 0]
+        self._overhead = [0, 0]
+
+    def connected(self, transport, upgrade_bytes: tuple):
+        self.transport = transport
+        self._wire = socket_bytes(transport)
+        sent, received = self._wire or upgrade_bytes
+        self.record(self.proxy, self.account, 'handshake', sent, received)
+
+    def sent(self, category: str, payload: int):
+        size = ws_frame_size(payload, masked=True)
+        self._counted[0] += size
+        self.record(self.proxy, self.account, category, size, 0)
+
+    def received(self, category: str, payload: int):
+        size = ws_frame_size(payload, masked=False)
+        self._counted[1] += size
+        self.record(self.proxy, self.account, category, 0, size)
+
+    def sample(self):
+        """Charge socket bytes not covered by counted frames to overhead."""
+        if self._wire is None:
+            return
+        wire = socket_bytes(self.transport)
+        if wire is None:
+            return
+        # Acked bytes trail the sends, so only report growth of the running gap
+        extra = [
+            max(self._overhead[i], wire[i] - self._wire[i] - self._counted[i])
+            for i in (0, 1)
+        ]
+        sent, received = extra[0] - self._overhead[0], extra[1] - self._overhead[1]
+        if sent or received:
+            self._overhead = extra
+            self.record(self.proxy, self.account, 'overhead', sent, received)
+
+class BandwidthLedger:
+    """Byte counters per proxy and per account, by category and direction.
+
+    Daily totals are kept per proxy, per account and fleet-wide; roll_day()
+    starts the next day. Fleet-wide per-minute buckets back the rolling
+    windows, and lifetime totals feed the Prometheus counters.
+    """
+
+    def __init__(self, window_minutes: int = 60):
+        self.day = date.today().isoformat()
+        self.proxies = {}  # proxy name -> counters
+        self.accounts = {}  # account -> counters
+        self.totals = self._counters()
+        self.lifetime = self._counters()
+        self._minutes = deque(maxlen=window_minutes)  # [minute, counters]
+
+    @staticmethod
+    def _counters() -> list:
+        return [0] * (len(CATEGORIES) * 2)
+
+    def add(self, proxy: str, account: str, category: str, sent: int, received: int):
+        index = _INDEX[category]
+        minute = int(time.time() // 60)
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append([minute, self._counters()])
+        targets = [self.totals, self.lifetime, self._minutes[-1][1]]
+        if proxy:
+            counters = self.proxies.get(proxy)
+            if counters is None:
+                counters = self.proxies[proxy] = self._counters()
+            targets.append(counters)
+        if account:
+            counters = self.accounts.get(account)
+            if counters is None:
+                counters = self.accounts[account] = self._counters()
+            targets.append(counters)
+        for counters in targets:
+            counters[index] += sent
+            counters[index + 1] += received
+
+    def window(self, minutes: int) -> list:
+        """Fleet-wide counters over the last minutes (at most the window size)."""
+        since = int(time.time() // 60) - minutes
+        totals = self._counters()
+        for minute, counters in self._minutes:
+            if minute > since:
+                for index, value in enumerate(counters):
+                    totals[index] += value
+        return totals
+
+    @staticmethod
+    def share(counters: list, *categories) -> float:
+        """Fraction of all bytes, both directions, that fall in the given categories."""
+        total = sum(counters)
+        if not total:
+            return 0.0
+        return sum(counters[_INDEX[c]] + counters[_INDEX[c] + 1] for c in categories) / total
+
+    @staticmethod
+    def by_category(counters: list) -> dict:
+        return {category: counters[index:index + 2] for category, index in _INDEX.items()}
+
+    def report(self) -> dict:
+        return {
+            'day': self.day,
+            'totals': self.by_category(self.totals),
+            'proxies': {proxy: self.by_category(counters) for proxy, counters in self.proxies.items()},
+            'accounts': {account: self.by_category(counters) for account, counters in self.accounts.items()}
+        }
+
+    def load(self, report: dict):
+        """Continue a day's totals from its saved report, e.g. after a restart."""
+        def counters(by_category):
+            values = self._counters()
+            for category, pair in by_category.items():
+                if category in _INDEX:
+                    values[_INDEX[category]:_INDEX[category] + 2] = pair
+            return values
+        self.day = report['day']
+        self.totals = counters(report.get('totals', {}))
+        self.proxies = {proxy: counters(c) for proxy, c in report.get('proxies', {}).items()}
+        self.accounts = {account: counters(c) for account, c in report.get('accounts', {}).items()}
+
+    def roll_day(self):
+        self.day = date.today().isoformat()
+        self.proxies = {}
+        self.accounts = {}
+        self.totals = self._counters()
+
+class BandwidthWriter:
+    """Persist the ledger as data/bandwidth/<day>.json, rewritten every interval and closed out at midnight."""
+
+    def __init__(self, ledger: BandwidthLedger, directory: str, interval: float = 300):
+        self.ledger = ledger
+        self.directory = directory
+        self.interval = interval
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f'{day}.json')
+
+    def load(self):
+        path = self._path(self.ledger.day)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.ledger.load(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Failed to load bandwidth totals from {path}: {str(e)}", file=sys.stderr)
+
+    def _write(self, report: dict):
+        path = self._path(report['day'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to save bandwidth totals: {str(e)}", file=sys.stderr)
+
+    def _take_report(self) -> dict:
+        report = self.ledger.report()
+        if self.ledger.day != date.today().isoformat():
+            # The finished day is written out once more below; counting moves on to the new day
+            self.ledger.roll_day()
+        return report
+
+    def save(self):
+        self._write(self._take_report())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # The report is built on the loop; only the file write runs in a thread
+            await asyncio.to_thread(self._write, self._take_report())
@@ -1,196 +1,272 @@
 import json
+import math
+import os
+import time
 import uuid
 import asyncio
 import aiohttp
-import aiohttp_socks
 from aiohttp import ClientWebSocketResponse
 from colorama import Fore
 from datetime import datetime
+from functools import partial
+from .session_registry import SessionRegistry
+from .dns_cache import DnsCache
+from .ip_cache import IpInfoCache
+from .reconnect import ReconnectScheduler
+from .circuit_breaker import ProxyHealth
+from .heartbeat import HeartbeatScheduler
+from .protocol_cache import ProtocolCache
+from .loop_monitor import LoopLagMonitor
+from .admission import AdmissionController
+from .load_shedding import LoadShedder
+from .endpoints import EndpointSelector
+from .phase_timing import ConnectionAttempt
+from .bandwidth import ConnectionTraffic, http_bytes
+
+WS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:92.0) Gecko/20100101 Firefox/92.0',
+    'Pragma': 'no-cache',
+    'Accept-Language': 'uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Cache-Control': 'no-cache',
+    'OS': 'Windows',
+    'Platform': 'Desktop',
+    'Browser': 'Mozilla',
+    'Origin': 'https://getgrass.io',
+    'Referer': 'https://getgrass.io/'
+}
 
 class Bot:
     def __init__(self, config, display_manager):
         self.config = config
         self.display = display_manager
         self.live = None
-        self.failed_proxies = {}  # Track failed attempts
+        self.proxy_health = ProxyHealth(
+            failure_threshold=config.breaker_failure_threshold,
+            open_time=config.breaker_open_time,
+            max_open_time=config.breaker_max_open_time,
+            multiplier=config.breaker_multiplier,
+            probe_timeout=config.timeout * 2 + 10
+        )
+        self.dns = DnsCache(ttl=config.dns_ttl, negative_ttl=config.dns_negative_ttl)
+        self.sessions = SessionRegistry(
+            max_sessions=config.max_sessions,
+            idle_timeout=config.session_idle_timeout,
+            dns_cache=self.dns
+        )
+        self.reconnects = ReconnectScheduler(config, on_reconnect=self.display.record_reconnect)
+        self.heartbeats = HeartbeatScheduler(
+            interval=config.ping_interval,
+            on_sent=self._on_ping_sent,
+            on_error=self._on_ping_error
+        )
+        self.protocols = ProtocolCache(os.path.join(config.data_dir, 'proxy_protocols.json'))
+        self.ip_cache = IpInfoCache(
+            os.path.join(config.data_dir, 'ip_cache.json'),
+            ttl=config.ip_cache_ttl,
+            negative_ttl=config.ip_cache_negative_ttl
+        )
+        self.loop_monitor = LoopLagMonitor()
+        self.admission = AdmissionController(
+            initial_limit=config.handshake_initial_limit,
+            min_limit=config.handshake_min_limit,
+            max_limit=config.handshake_max_limit,
+            window=config.handshake_window,
+            max_lag=config.handshake_max_lag,
+            lag_monitor=self.loop_monitor
+        )
+        self.shedder = LoadShedder(
+            self.loop_monitor,
+            self.admission,
+            self.display,
+            self._pause_connections,
+            high_lag=config.shed_high_lag,
+            low_lag=config.shed_low_lag,
+            sustain=config.shed_sustain,
+            recover=config.shed_recover,
+            pause_fraction=config.shed_pause_fraction
+        )
+        self.endpoints = EndpointSelector(
+            config.wss_list,
+            probe=self._probe_endpoint,
+            routes=self.sessions.sample_keys,
+            probe_interval=config.endpoint_probe_interval,
+            probe_sample=config.endpoint_probe_sample,
+            probe_timeout=config.endpoint_probe_timeout,
+            on_preferred=self._on_preferred_endpoint
+        )
+        self._sockets = set()  # open WebSockets, for the shutdown drain
 
     async def get_proxy_ip(self, proxy: str) -> dict:
+        # Egress IPs rarely change between reconnects, so serve them from the cache
+        return await self.ip_cache.get(proxy, self._fetch_proxy_ip)
+
+    async def _fetch_proxy_ip(self, proxy: str) -> dict:
         try:
             if proxy:
                 # Parse proxy components
-                proxy_parts = proxy.replace('socks5://', '').split('@')
+                proxy_parts = proxy.split('://', 1)[-1].split('@')
                 if len(proxy_parts) != 2:
                     self.display.add_error(f"Invalid proxy format: {proxy}")
                     return None
-                
-                auth, address = proxy_parts
-                username, password = auth.split(':')
-                host, port = address.split(':')
-
-                # Create connector with explicit authentication
-                connector = aiohttp_socks.ProxyConnector(
-                    proxy_type=aiohttp_socks.ProxyType.SOCKS5,
-                    host=host,
-                    port=int(port),
-                    username=username,
-                    password=password,
-                    rdns=True
-                )
-                
-                async with aiohttp.ClientSession(connector=connector) as session:
-                    async with session.get(self.config.ip_check_url, timeout=10) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            self.display.add_error(f"IP check failed with status {response.status} for {proxy}")
-                            return None
+
+                formatted_proxy = self.sessions.format_proxy(proxy)
+                known = self.protocols.get(formatted_proxy)
+                errors = []
+                # Same protocol order as the WebSocket, so HTTP-only proxies pass the check too
+                for protocol in self.protocols.order(formatted_proxy):
+                    try:
+                        proxy_info = await self._check_ip(self.sessions.format_proxy(proxy, protocol), proxy)
+                    except asyncio.TimeoutError:
+                        errors.append(f"{protocol.upper()} timeout")
+                    except Exception as error:
+                        errors.append(f"{protocol.upper()} error: {str(error)}")
+                    else:
+                        # The tunnel is up even if the check answered with an error status
+                        self.protocols.record(formatted_proxy, protocol)
+                        return proxy_info
+                    if protocol == known:
+                        self.protocols.forget(formatted_proxy)
+
+                self.display.add_error(f"IP check failed for {proxy}: {', '.join(errors)}")
+                return None
             else:
-                async with aiohttp.ClientSession() as session:
+                session = await self.sessions.acquire()
+                try:
                     async with session.get(self.config.ip_check_url) as response:
+                        body = await response.read()
+                        self.display.record_bytes(None, None, 'http', *http_bytes(response, len(body)))
                         if response.status == 200:
-                            return await response.json()
-            return None
-        except aiohttp_socks.ProxyError as e:
-            self.display.add_error(f"Proxy error for {proxy}: {str(e)}")
-            return None
-        except asyncio.TimeoutError:
-            self.display.add_error(f"Timeout checking IP for {proxy}")
+                            return json.loads(body)
+                finally:
+                    self.sessions.release()
             return None
         except Exception as e:
             self.display.add_error(f"IP check error for {proxy}: {str(e)}")
             return None
 
-    async def create_websocket_connection(self, proxy: str = None):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:92.0) Gecko/20100101 Firefox/92.0',
-            'Pragma': 'no-cache',
-            'Accept-Language': 'uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Cache-Control': 'no-cache',
-            'OS': 'Windows',
-            'Platform': 'Desktop',
-            'Browser': 'Mozilla',
-            'Origin': 'https://getgrass.io',
-            'Referer': 'https://getgrass.io/'
-        }
-
-        session = None
+    async def _check_ip(self, session_key: str, proxy: str) -> dict:
+        """IP info through the session for session_key; None if the check answered with an error status."""
+        session = await self.sessions.acquire(session_key)
+        try:
+            async with session.get(self.config.ip_check_url, timeout=10) as response:
+                body = await response.read()
+                self.display.record_bytes(proxy, None, 'http', *http_bytes(response, len(body)))
+                if response.status == 200:
+                    return json.loads(body)
+                self.display.add_error(f"IP check failed with status {response.status} for {proxy}")
+                return None
+        finally:
+            self.sessions.release(session_key)
+
+    async def create_websocket_connection(self, proxy: str = None, host: str = None):
+        headers = WS_HEADERS
+
         try:
             if proxy:
-                # Try SOCKS5 first
-                try:
-                    formatted_proxy = proxy.strip()
-                    if not formatted_proxy.startswith('socks5://'):
-                        formatted_proxy = f'socks5://{formatted_proxy}'
-                    
-                    connector = aiohttp_socks.ProxyConnector.from_url(
-                        formatted_proxy, 
-                        ssl=self.config.ssl_context,
-                        rdns=True
-                    )
-                    session = aiohttp.ClientSession(connector=connector)
-                    
-                    # Try to establish connection with SOCKS5
-                    websocket = await session.ws_connect(
-                        f"wss://{self.config.wss_host}",
-                        headers=headers,
-                        ssl=self.config.ssl_context,
-                        timeout=self.config.timeout,
-                        heartbeat=20
-                    )
-                    
-                    self.display.add_activity({
-                        'time': datetime.now(),
-                        'success': True,
-                        'message': f'Connected via SOCKS5: {proxy}',
-                        'status': 'Connected'
-                    })
-                    
-                    return websocket, session
-                    
-                except Exception as socks_error:
-                    # If SOCKS5 fails, close the session and try HTTP
-                    if session:
-                        await session.close()
-                        session = None
-                    
-                    self.display.add_activity({
-                        'time': datetime.now(),
-                        'success': False,
-                        'message': f'SOCKS5 failed, trying HTTP: {proxy}',
-                        'status': 'Switching'
-                    })
-                    
-                    # Try HTTP fallback
+                formatted_proxy = self.sessions.format_proxy(proxy)
+                known = self.protocols.get(formatted_proxy)
+                errors = []
+                # Go straight to the protocol that worked last time; re-probe the others only on failure
+                for protocol in self.protocols.order(formatted_proxy):
                     try:
-                        session = aiohttp.ClientSession()
-                        headers['proxy'] = proxy
-                        
-                        websocket = await session.ws_connect(
-                            f"wss://{self.config.wss_host}",
-                            headers=headers,
-                            ssl=self.config.ssl_context,
-                            timeout=self.config.timeout,
-                            heartbeat=20
+                        # Both protocols tunnel through the proxy (SOCKS5, or HTTP CONNECT), each on its own session
+                        websocket, session_key = await self._open_websocket(
+                            self.sessions.format_proxy(proxy, protocol), headers, host
                         )
-                        
+                    except Exception as error:
+                        errors.append(f"{protocol.upper()} error: {str(error)}")
+                        if protocol == known:
+                            self.protocols.forget(formatted_proxy)
                         self.display.add_activity({
                             'time': datetime.now(),
-                            'success': True,
-                            'message': f'Connected via HTTP: {proxy}',
-                            'status': 'Connected'
+                            'success': False,
+                            'message': f'{protocol.upper()} failed, re-probing: {proxy}',
+                            'status': 'Switching'
                         })
-                        
-                        return websocket, session
-                        
-                    except Exception as http_error:
-                        if session:
-                            await session.close()
-                        raise Exception(f"Both SOCKS5 and HTTP failed: SOCKS5 error: {str(socks_error)}, HTTP error: {str(http_error)}")
+                        continue
+
+                    self.protocols.record(formatted_proxy, protocol)
+                    self.display.add_activity({
+                        'time': datetime.now(),
+                        'success': True,
+                        'message': f'Connected via {protocol.upper()}: {proxy}',
+                        'status': 'Connected'
+                    })
+                    return websocket, session_key
+
+                raise Exception(f"Both SOCKS5 and HTTP failed: {', '.join(errors)}")
             else:
                 # Direct connection without proxy
-                session = aiohttp.ClientSession()
-                websocket = await session.ws_connect(
-                    f"wss://{self.config.wss_host}",
-                    headers=headers,
-                    ssl=self.config.ssl_context,
-                    timeout=self.config.timeout,
-                    heartbeat=20
-                )
-                return websocket, session
+                return await self._open_websocket(None, headers, host)
 
         except Exception as e:
-            if session:
-                await session.close()
             raise Exception(f"WebSocket connection failed: {str(e)}")
 
-    async def send_ping(self, websocket: ClientWebSocketResponse, proxy_ip: str):
-        while True:
-            try:
-                ping_message = {
-                    'id': str(uuid.uuid4()),
-                    'version': '1.0.0',
-                    'action': 'PING',
-                    'data': {}
-                }
-                await websocket.send_json(ping_message)
-                self.display.add_activity({
-                    'time': datetime.now(),
-                    'success': True,
-                    'message': f'Ping sent via {proxy_ip}',
-                    'status': 'Active'
-                })
-                self.display.update_stats(success=True, proxy=proxy_ip)
-                self.display.update_display(self.live)
-                await asyncio.sleep(26)
-            except Exception as e:
-                self.display.add_error(f"Ping error: {str(e)}")
-                break
+    async def _open_websocket(self, session_key: str, headers: dict, host: str = None):
+        """Upgrade on the shared session for session_key; the caller owns the lease on success."""
+        session = await self.sessions.acquire(session_key)
+        try:
+            websocket = await session.ws_connect(
+                f"{self.config.wss_scheme}://{host or self.config.wss_host}",
+                headers=headers,
+                ssl=self.config.ssl_context,
+                timeout=self.config.timeout,
+                heartbeat=self.config.ws_heartbeat
+            )
+        except BaseException:
+            self.sessions.release(session_key)
+            raise
+        return websocket, session_key
 
-    async def handle_websocket(self, websocket: ClientWebSocketResponse, user_id: str, proxy_ip: str):
+    async def _probe_endpoint(self, host: str, session_key: str):
+        """Time a bare upgrade to host over an existing session; the socket is closed right away."""
+        # The attempt tells the SSL context which endpoint's TLS session to offer
+        with ConnectionAttempt(host=host).track():
+            websocket, session_key = await self._open_websocket(session_key, WS_HEADERS, host)
+        try:
+            self._record_tls(websocket, host)
+            await websocket.close()
+        finally:
+            self.sessions.release(session_key)
+
+    def _on_preferred_endpoint(self, host: str, stats):
+        rtt = f"{stats.rtt * 1000:.0f}ms" if stats.rtt is not None else "unmeasured"
+        self.display.add_activity({
+            'time': datetime.now(),
+            'success': True,
+            'message': f'Preferred endpoint is now {host} ({rtt}, {stats.failure_rate:.0%} failures)',
+            'status': 'Endpoint'
+        })
+
+    def _on_ping_sent(self, proxy_ip: str):
+        self.display.add_activity({
+            'time': datetime.now(),
+            'success': True,
+            'message': f'Ping sent via {proxy_ip}',
+            'status': 'Active'
+        })
+        self.display.update_stats(success=True, proxy=proxy_ip)
+        self.display.update_display(self.live)
+
+    def _on_ping_error(self, proxy_ip: str, error: Exception):
+        self.display.add_error(f"Ping error via {proxy_ip}: {str(error)}")
+
+    async def handle_websocket(self, websocket: ClientWebSocketResponse, user_id: str, proxy_ip: str, heartbeat=None,
+                               host: str = None, attempt: ConnectionAttempt = None,
+                               traffic: ConnectionTraffic = None):
         try:
             async for msg in websocket:
+                if heartbeat:
+                    self.heartbeats.touch(heartbeat)
                 if msg.type == aiohttp.WSMsgType.TEXT:
                     message = json.loads(msg.data)
+                    if traffic is not None:
+                        # Server messages are plain ASCII JSON, so characters are bytes
+                        action = message.get('action')
+                        traffic.received(
+                            'auth' if action == 'AUTH' else 'pong' if action == 'PONG' else 'messages',
+                            len(msg.data)
+                        )
                     
                     activity_data = {
                         'time': datetime.now(),
@@ -198,7 +274,7 @@ class Bot:
                         'message': 'Ping Successful',
                         'uid': user_id,
                         'proxy': proxy_ip,
-                        'url': self.config.wss_host,
+                        'url': host or self.config.wss_host,
                         'response': '0.00',
                         'status': 'Active'
                     }
@@ -224,8 +300,14 @@ class Bot:
                                 'version': '4.28.2'
                             }
                         }
-                        await websocket.send_json(auth_response)
-                        print(f"{Fore.GREEN}Sent auth response: {json.dumps(auth_response)}")
+                        data = json.dumps(auth_response)
+                        await websocket.send_str(data)
+                        if traffic is not None:
+                            traffic.sent('auth', len(data))
+                        if attempt is not None:
+                            attempt.mark('auth')
+                            self._finish_attempt(attempt)
+                        print(f"{Fore.GREEN}Sent auth response: {data}")
                     
                     elif message.get('action') == 'PONG':
                         print(f"{Fore.BLUE}Received PONG: {json.dumps(message)}")
@@ -241,7 +323,7 @@ class Bot:
                 'message': f'Error: {str(e)}',
                 'uid': user_id,
                 'proxy': proxy_ip,
-                'url': self.config.wss_host,
+                'url': host or self.config.wss_host,
                 'response': '0.00',
                 'status': 'Failed'
             }
@@ -251,26 +333,120 @@ class Bot:
             print(f"{Fore.RED}WebSocket error: {str(e)}")
             return
 
+    async def close_sockets(self, timeout: float) -> tuple:
+        """Close every open WebSocket concurrently and abort those still closing after timeout.
+
+        Returns (closed, aborted).
+        """
+        sockets = [websocket for websocket in self._sockets if not websocket.closed]
+        if not sockets:
+            return 0, 0
+        closers = [asyncio.create_task(websocket.close()) for websocket in sockets]
+        _, pending = await asyncio.wait(closers, timeout=timeout)
+
+        stuck = [websocket for websocket, closer in zip(sockets, closers) if closer in pending]
+        for websocket in stuck:
+            self._abort(websocket)
+        for closer in pending:
+            closer.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(sockets) - len(stuck), len(stuck)
+
+    @staticmethod
+    def _transport(websocket):
+        # aiohttp keeps the socket on the upgrade response and has no public accessor for it
+        connection = getattr(getattr(websocket, '_response', None), 'connection', None)
+        return connection.transport if connection is not None else None
+
+    @staticmethod
+    def _abort(websocket):
+        # aiohttp has no public abort for client websockets; drop the transport without a close handshake
+        transport = Bot._transport(websocket)
+        if transport is not None:
+            transport.abort()
+
+    def _record_tls(self, websocket, host: str):
+        """Hand the socket's TLS session back to the shared context for host; returns whether it resumed, None for ws://."""
+        transport = self._transport(websocket)
+        ssl_object = transport.get_extra_info('ssl_object') if transport is not None else None
+        if ssl_object is None:
+            return None
+        return self.config.ssl_context.record(ssl_object, host)
+
+    async def close(self):
+        """Stop the background helpers and close the shared sessions, all at once."""
+        await asyncio.gather(
+            self.heartbeats.close(),
+            self.shedder.close(),
+            self.loop_monitor.close(),
+            self.endpoints.close(),
+            self.sessions.close_all()
+        )
+        await self.dns.close()
+
+    def flush(self):
+        self.ip_cache.save()
+        self.protocols.save()
+
+    def connection_factory(self, key):
+        """Coroutine factory for a supervised (user_id, proxy) connection; proxy None means direct."""
+        user_id, proxy = key
+        if proxy is None:
+            return partial(self.connect_directly, user_id)
+        return partial(self.connect_with_proxy, proxy, user_id)
+
+    def _pause_connections(self, fraction: float) -> int:
+        """Drop the lowest-scoring share of open sockets; their reconnects wait at the held admission queue."""
+        heartbeats = self.heartbeats.lowest_scoring(math.ceil(len(self.heartbeats) * fraction))
+        for heartbeat in heartbeats:
+            # No close handshake: the loop is already saturated
+            self._abort(heartbeat.websocket)
+        return len(heartbeats)
+
+    def _record_proxy_failure(self, proxy: str):
+        if self.proxy_health.record_failure(proxy):
+            # Logged once per trip instead of once per skipped attempt
+            breaker = self.proxy_health.get(proxy)
+            self.display.add_activity({
+                'time': datetime.now(),
+                'success': False,
+                'message': f'Skipping unreliable proxy {proxy} for {breaker.open_time:.0f}s',
+                'status': 'Skipped'
+            })
+
+    def _start_traffic(self, websocket, proxy: str, user_id: str) -> ConnectionTraffic:
+        traffic = ConnectionTraffic(self.display.record_bytes, proxy, user_id)
+        traffic.connected(self._transport(websocket), http_bytes(websocket._response))
+        return traffic
+
+    def _finish_attempt(self, attempt: ConnectionAttempt, error: str = None):
+        # Each attempt is reported once: at its first AUTH, or with whatever phases it got through
+        if attempt is None or attempt.finished:
+            return
+        attempt.finished = True
+        self.display.record_connection_phases(attempt.proxy, attempt.host, attempt.phases, error)
+
+    def _finish_connection(self, backoff, connected_at: float):
+        # Only a connection that stayed up for a while counts as healthy and resets the backoff
+        if connected_at and time.monotonic() - connected_at >= self.config.healthy_connection_time:
+            backoff.reset()
+
     async def connect_with_proxy(self, proxy: str, user_id: str):
+        self.shedder.start()
+        backoff = self.reconnects.backoff()
         while True:
             try:
-                # Skip proxy if it has failed too many times
-                if proxy in self.failed_proxies and self.failed_proxies[proxy] > 3:
-                    self.display.add_activity({
-                        'time': datetime.now(),
-                        'success': False,
-                        'message': f'Skipping unreliable proxy {proxy}',
-                        'status': 'Skipped'
-                    })
-                    await asyncio.sleep(20)  # Wait 20 seconds before retrying
-                    self.failed_proxies[proxy] = 0  # Reset counter
+                # Skip proxy while its circuit breaker is open or another task is probing it
+                wait = self.proxy_health.before_attempt(proxy)
+                if wait > 0:
+                    await asyncio.sleep(wait)
                     continue
 
-                session = None
                 websocket = None
+                attempt = None
                 try:
                     # Add proxy to used proxies set
-                    self.display.used_proxies.add(proxy)
+                    self.display.add_used_proxy(proxy)
                     
                     # Debug log
                     self.display.add_activity({
@@ -281,75 +457,141 @@ class Bot:
                     })
                     self.display.update_display(self.live)
 
-                    proxy_info = await self.get_proxy_ip(proxy)
+                    # The IP check and upgrade hold an admission slot so startup ramps up instead of stampeding
+                    await self.admission.acquire()
+                    attempt = ConnectionAttempt(proxy)
+                    handshake_ok = False
+                    try:
+                        proxy_info = await self.get_proxy_ip(proxy)
+                        attempt.mark('ip_check')
+                        if proxy_info:
+                            # Format proxy like the Node.js version
+                            formatted_proxy = self.sessions.format_proxy(proxy)
+
+                            # Create WebSocket connection on the shared per-proxy session
+                            host = attempt.host = self.endpoints.choose()
+                            started = time.monotonic()
+                            try:
+                                with attempt.track():
+                                    websocket, session_key = await self.create_websocket_connection(formatted_proxy, host)
+                                attempt.mark('upgrade')
+                            except Exception:
+                                # The IP check may be a cached answer, so the proxy is only cleared once
+                                # its tunnel is up; failures before that say nothing about the endpoint
+                                if 'socks' in attempt.phases:
+                                    self.endpoints.record(host, False)
+                                raise
+                            elapsed = time.monotonic() - started
+                            self.endpoints.record(host, True, elapsed)
+                            self.display.record_handshake(elapsed, self._record_tls(websocket, host))
+                            handshake_ok = True
+                    finally:
+                        self.admission.release(handshake_ok)
+
                     if not proxy_info:
+                        self._finish_attempt(attempt, 'IP check failed')
                         self.display.add_error(f"Failed to get IP info for proxy {proxy}")
-                        await asyncio.sleep(self.config.retry_interval)
+                        self._record_proxy_failure(proxy)
+                        await self.reconnects.wait(backoff)
                         continue
 
-                    # Format proxy like the Node.js version
-                    formatted_proxy = proxy.strip()
-                    if not (formatted_proxy.startswith('socks5://') or formatted_proxy.startswith('http')):
-                        formatted_proxy = f'socks5://{formatted_proxy}'
-
-                    # Create WebSocket connection
-                    websocket, session = await self.create_websocket_connection(formatted_proxy)
-                    
-                    # Debug log successful connection
-                    self.display.add_activity({
-                        'time': datetime.now(),
-                        'success': True,
-                        'message': f'Connected to {self.config.wss_host} via {proxy}',
-                        'status': 'Connected'
-                    })
-                    self.display.update_display(self.live)
-
-                    # Start ping task
-                    ping_task = asyncio.create_task(self.send_ping(websocket, proxy_info.get('ip', 'Unknown')))
-                    
+                    connected_at = time.monotonic()
+                    self.proxy_health.record_success(proxy)
+                    self._sockets.add(websocket)
+                    self.display.connection_opened()
+                    traffic = self._start_traffic(websocket, proxy, user_id)
+                    heartbeat = None
                     try:
-                        await self.handle_websocket(websocket, user_id, proxy_info.get('ip', 'Unknown'))
+                        # Debug log successful connection
+                        self.display.add_activity({
+                            'time': datetime.now(),
+                            'success': True,
+                            'message': f'Connected to {host} via {proxy}',
+                            'status': 'Connected'
+                        })
+                        self.display.update_display(self.live)
+
+                        # Hand the socket to the shared heartbeat wheel
+                        proxy_ip = proxy_info.get('ip', 'Unknown')
+                        heartbeat = self.heartbeats.register(websocket, proxy_ip, traffic=traffic)
+                        await self.handle_websocket(websocket, user_id, proxy_ip, heartbeat, host, attempt, traffic)
                     finally:
-                        ping_task.cancel()
-                        if websocket and not websocket.closed:
+                        self._finish_attempt(attempt, 'Closed before AUTH')
+                        self.heartbeats.unregister(heartbeat)
+                        traffic.sample()
+                        if not websocket.closed:
                             await websocket.close()
-                        if session:
-                            await session.close()
+                        self.sessions.release(session_key)
+                        self._sockets.discard(websocket)
+                        self.display.connection_closed()
+                        self._finish_connection(backoff, connected_at)
 
                 except Exception as e:
-                    if proxy not in self.failed_proxies:
-                        self.failed_proxies[proxy] = 0
-                    self.failed_proxies[proxy] += 1
+                    self._finish_attempt(attempt, str(e))
+                    self._record_proxy_failure(proxy)
                     self.display.add_error(f"Connection error with proxy {proxy}: {str(e)}", proxy)
                     if websocket and not websocket.closed:
                         await websocket.close()
-                    if session:
-                        await session.close()
                 
                 self.display.update_display(self.live)
-                await asyncio.sleep(self.config.retry_interval)
+                await self.reconnects.wait(backoff)
 
             except Exception as e:
-                if proxy not in self.failed_proxies:
-                    self.failed_proxies[proxy] = 0
-                self.failed_proxies[proxy] += 1
+                self._record_proxy_failure(proxy)
                 self.display.add_error(f"Connection error with proxy {proxy}: {str(e)}", proxy)
-                await asyncio.sleep(self.config.retry_interval)
+                await self.reconnects.wait(backoff)
 
     async def connect_directly(self, user_id: str):
+        self.shedder.start()
+        backoff = self.reconnects.backoff()
         while True:
+            attempt = None
             try:
-                websocket = await self.create_websocket_connection()
+                host = self.endpoints.choose()
+                await self.admission.acquire()
+                attempt = ConnectionAttempt(host=host)
+                handshake_ok = False
+                started = time.monotonic()
+                try:
+                    with attempt.track():
+                        websocket, session_key = await self.create_websocket_connection(host=host)
+                    attempt.mark('upgrade')
+                    handshake_ok = True
+                except Exception:
+                    self.endpoints.record(host, False)
+                    raise
+                finally:
+                    self.admission.release(handshake_ok)
+                elapsed = time.monotonic() - started
+                self.endpoints.record(host, True, elapsed)
+                self.display.record_handshake(elapsed, self._record_tls(websocket, host))
+                connected_at = time.monotonic()
+                self._sockets.add(websocket)
+                self.display.connection_opened()
+                traffic = self._start_traffic(websocket, None, user_id)
                 print(f"{Fore.CYAN}Connected directly without proxy")
 
-                proxy_info = await self.get_proxy_ip(None)
-                ip = proxy_info.get('ip', 'Direct IP') if proxy_info else 'Direct IP'
+                heartbeat = None
+                try:
+                    proxy_info = await self.get_proxy_ip(None)
+                    attempt.mark('ip_check')
+                    ip = proxy_info.get('ip', 'Direct IP') if proxy_info else 'Direct IP'
 
-                ping_task = asyncio.create_task(self.send_ping(websocket, ip))
-                await self.handle_websocket(websocket, user_id, ip)
-                ping_task.cancel()
+                    heartbeat = self.heartbeats.register(websocket, ip, traffic=traffic)
+                    await self.handle_websocket(websocket, user_id, ip, heartbeat, host, attempt, traffic)
+                finally:
+                    self._finish_attempt(attempt, 'Closed before AUTH')
+                    self.heartbeats.unregister(heartbeat)
+                    traffic.sample()
+                    if not websocket.closed:
+                        await websocket.close()
+                    self.sessions.release(session_key)
+                    self._sockets.discard(websocket)
+                    self.display.connection_closed()
+                    self._finish_connection(backoff, connected_at)
 
             except Exception as e:
+                self._finish_attempt(attempt, str(e))
                 print(f"{Fore.RED}Failed to connect directly: {str(e)}")
             
-            await asyncio.sleep(self.config.retry_interval)
\ No newline at end of file
+            await self.reconnects.wait(backoff)
\ No newline at end of file
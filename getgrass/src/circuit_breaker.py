@@ -0,0 +1,124 @@
+import time
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+class CircuitBreaker:
+    """Health state of one proxy, shared by every uid that connects through it."""
+
+    __slots__ = ('state', 'failures', 'open_time', 'opened_at', 'probe_started', 'trips')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0  # consecutive failures
+        self.open_time = 0.0  # length of the current open window
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.trips = 0  # consecutive times the breaker opened without a success
+
+class ProxyHealth:
+    """Per-proxy circuit breakers with exponentially growing open windows.
+
+    closed: attempts go through, failures are counted.
+    open: attempts are refused until the open window ends.
+    half-open: one task probes the proxy; the others wait for its result.
+    """
+
+    def __init__(self, failure_threshold: int = 3, open_time: float = 20,
+                 max_open_time: float = 600, multiplier: float = 2.0, probe_timeout: float = 90):
+        self.failure_threshold = failure_threshold
+        self.base_open_time = open_time
+        self.max_open_time = max_open_time
+        self.multiplier = multiplier
+        self.probe_timeout = probe_timeout
+        self.breakers = {}
+
+    def get(self, proxy: str) -> CircuitBreaker:
+        breaker = self.breakers.get(proxy)
+        if breaker is None:
+            breaker = self.breakers[proxy] = CircuitBreaker()
+        return breaker
+
+    def state(self, proxy: str) -> str:
+        breaker = self.breakers.get(proxy)
+        return breaker.state if breaker else CLOSED
+
+    def before_attempt(self, proxy: str) -> float:
+        """Return 0 if the caller may attempt a connection now, else seconds to wait."""
+        breaker = self.breakers.get(proxy)
+        if breaker is None or breaker.state == CLOSED:
+            return 0.0
+
+        now = time.monotonic()
+        if breaker.state == OPEN:
+            remaining = breaker.opened_at + breaker.open_time - now
+            if remaining > 0:
+                return remaining
+            # Open window is over: this caller becomes the probe
+            breaker.state = HALF_OPEN
+            breaker.probe_started = now
+            return 0.0
+
+        # Half-open: wait for the in-flight probe unless it has gone silent
+        if now - breaker.probe_started > self.probe_timeout:
+            breaker.probe_started = now
+            return 0.0
+        return min(self.base_open_time, self.probe_timeout)
+
+    def record_success(self, proxy: str):
+        breaker = self.breakers.get(proxy)
+        if breaker is None:
+            return
+        breaker.state = CLOSED
+        breaker.failures = 0
+        breaker.trips = 0
+        breaker.open_time = 0.0
+
+    def record_failure(self, proxy: str) -> bool:
+        """Count a failed attempt; returns True if this failure opened the breaker."""
+        breaker = self.get(proxy)
+        breaker.failures += 1
+        if breaker.state == HALF_OPEN or (breaker.state == CLOSED and breaker.failures >= self.failure_threshold):
+            self._trip(breaker)
+            return True
+        return False
+
+    def _trip(self, breaker: CircuitBreaker):
+        breaker.open_time = min(
+            self.max_open_time,
+            self.base_open_time * self.multiplier ** min(breaker.trips, 32)
+        )
+        breaker.trips += 1
+        breaker.state = OPEN
+        breaker.opened_at = time.monotonic()
+
+    def export(self) -> dict:
+        """Breakers that are not plainly healthy, with open windows as wall-clock deadlines."""
+        now, wall = time.monotonic(), time.time()
+        return {
+            proxy: {
+                'failures': breaker.failures,
+                'trips': breaker.trips,
+                'open_time': breaker.open_time,
+                'open_until': wall + breaker.opened_at + breaker.open_time - now if breaker.state != CLOSED else 0.0
+            }
+            for proxy, breaker in self.breakers.items()
+            if breaker.failures or breaker.trips
+        }
+
+    def restore(self, states: dict):
+        """Resume breakers from export(); one whose window ran out meanwhile lets a single probe through first."""
+        now, wall = time.monotonic(), time.time()
+        for proxy, state in states.items():
+            breaker = self.get(proxy)
+            breaker.failures = state['failures']
+            breaker.trips = state['trips']
+            if state['open_until']:
+                breaker.state = OPEN
+                breaker.open_time = state['open_time']
+                breaker.opened_at = now + max(0.0, state['open_until'] - wall) - breaker.open_time
+
+    def counts(self) -> dict:
+        result = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for breaker in self.breakers.values():
+            result[breaker.state] += 1
+        return result
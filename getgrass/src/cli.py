@@ -0,0 +1,37 @@
+import argparse
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='GetGrass Bot')
+    parser.add_argument('-w', '--workers',
+                       type=int,
+                       default=1,
+                       help='Number of worker processes; above 1 shards connections across processes')
+    parser.add_argument('--headless',
+                       action='store_true',
+                       help='Run without the terminal UI and emit JSON-lines stats snapshots instead')
+    parser.add_argument('--stats-interval',
+                       type=float,
+                       default=10,
+                       help='Seconds between JSON-lines snapshots in headless mode')
+    parser.add_argument('--stats-output',
+                       default='-',
+                       help='File to append JSON-lines snapshots to; "-" is stdout')
+    parser.add_argument('--metrics-port',
+                       type=int,
+                       default=None,
+                       help='Serve Prometheus metrics on this port (disabled by default)')
+    parser.add_argument('--metrics-host',
+                       default='127.0.0.1',
+                       help='Address the metrics endpoint binds to')
+    parser.add_argument('--debug',
+                       action='store_true',
+                       help='Debug profile: asyncio debug mode, slow callbacks logged to data/asyncio_debug.log')
+    parser.add_argument('--slow-callback',
+                       type=float,
+                       default=0.1,
+                       help='Seconds a callback may run before the debug profile logs it')
+    parser.add_argument('--profile-seconds',
+                       type=float,
+                       default=30,
+                       help='Length of the sampling profile started by SIGUSR1 (written to data/profiles/)')
+    return parser.parse_args(argv)
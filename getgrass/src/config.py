@@ -1,5 +1,7 @@
+import os
 import random
 import ssl
+from .tls_sessions import ResumingSSLContext
 
 class Config:
     def __init__(self):
@@ -7,14 +9,66 @@ class Config:
         self.wss_list = ['proxy2.wynd.network:4444', 'proxy2.wynd.network:4650']
         self.retry_interval = 20  # seconds
         self.wss_host = random.choice(self.wss_list)
+        self.wss_scheme = 'wss'  # 'ws' is only for the local benchmark stand-in
+        self.ping_interval = 26  # seconds between application PINGs
+        self.ws_heartbeat = None  # aiohttp protocol pings are off; application PINGs are the single keepalive
         self.ssl_verify = False
         self.timeout = 30
+        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
         
-        # SSL context
-        self.ssl_context = ssl.create_default_context()
+        # SSL context; shared by every connection so TLS sessions are resumed per endpoint
+        self.ssl_context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.ssl_context.load_default_certs()
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
         
         self.min_retry_interval = 20
         self.max_retry_interval = 300
-        self.retry_multiplier = 1.5
\ No newline at end of file
+        self.retry_multiplier = 1.5
+        self.max_reconnects_per_second = 50  # fleet-wide cap
+        self.reconnect_burst = 100
+        self.healthy_connection_time = 60  # seconds connected before backoff resets
+        self.task_restart_delay = 5  # seconds before the supervisor restarts a crashed task
+        self.source_reload_interval = 5  # seconds between proxy.txt / uid.txt change checks
+        self.shutdown_timeout = 10  # seconds to drain every connection on shutdown
+        self.phase_report_interval = 60  # seconds between data/connection_phases.json rewrites
+        self.bandwidth_save_interval = 300  # seconds between data/bandwidth/<day>.json rewrites
+        self.proxy_state_interval = 60  # seconds between data/proxy_state.json rewrites
+        self.proxy_state_max_age = 86400  # seconds; older snapshots are ignored at start
+
+        # Shared session registry
+        self.max_sessions = 2048
+        self.session_idle_timeout = 300  # seconds
+
+        # Shared DNS cache
+        self.dns_ttl = 300  # seconds
+        self.dns_negative_ttl = 30  # seconds
+
+        # Egress IP cache
+        self.ip_cache_ttl = 3600  # seconds
+        self.ip_cache_negative_ttl = 60  # seconds
+
+        # Per-proxy circuit breaker
+        self.breaker_failure_threshold = 3
+        self.breaker_open_time = 20  # seconds, doubles on every re-trip
+        self.breaker_max_open_time = 600
+        self.breaker_multiplier = 2
+
+        # Handshake admission control
+        self.handshake_initial_limit = 32  # concurrent handshakes admitted at startup
+        self.handshake_min_limit = 8
+        self.handshake_max_limit = 1024
+        self.handshake_window = 2  # seconds between limit adjustments
+        self.handshake_max_lag = 0.2  # seconds of event-loop lag before the limit is cut
+
+        # Load shedding under sustained event-loop lag
+        self.shed_high_lag = 0.25  # seconds of smoothed lag that count as overloaded
+        self.shed_low_lag = 0.05  # seconds of lag under which the loop counts as recovered
+        self.shed_sustain = 5  # seconds overloaded before shedding one level more
+        self.shed_recover = 15  # seconds recovered before shedding one level less
+        self.shed_pause_fraction = 0.1  # share of connections dropped per overloaded period at the top level
+
+        # WSS endpoint selection across wss_list
+        self.endpoint_probe_interval = 60  # seconds between background probe rounds
+        self.endpoint_probe_sample = 3  # routes (proxies) probed per round
+        self.endpoint_probe_timeout = 10  # seconds
@@ -1,4 +1,5 @@
 import os
+import asyncio
 from datetime import datetime
 from rich.console import Console
 from rich.layout import Layout
@@ -7,39 +8,102 @@ from rich.table import Table
 from rich import box
 from rich.text import Text
 from rich.style import Style
+from .error_logger import ErrorLogWriter
+from .stats_store import StatsStore, INACTIVE, POOR, ACTIVE
+from .phase_timing import PhaseStats
+from .bandwidth import BandwidthLedger, format_bytes
 
 class DisplayManager:
+    PANELS = ("header", "metrics", "network", "proxies", "activity")
+    PROXY_ROWS = 16  # rows that fit in the proxy panel
+    SHEDDING_REFRESH = 1  # redraws per second while load shedding is active
+
     def __init__(self):
         self.console = Console()
         self.start_time = datetime.now()
-        self.total_pings = 0
-        self.failed_pings = 0
-        self.last_success = None
-        self.recent_activity = []
-        self.proxy_stats = {}
+        self.stats = StatsStore(activity_size=30)
+        self.phases = PhaseStats(slowest=20)
+        self.bandwidth = BandwidthLedger()
         self.active_proxies = 0
         self.errors = []
         self.is_running = True
         self.total_proxies = 0
-        self.used_proxies = set()
+        self._identities = {}  # raw proxy -> proxy_identity(), for the per-proxy ledgers
+
+        # Coalesced rendering: state changes mark panels dirty, run_renderer redraws
+        self.live = None
+        self.refresh_per_second = 4
+        self.shedding_level = 0  # LoadShedder level; the coordinator shows the highest of its workers
+        self._layout = None
+        self._dirty = set(self.PANELS)
+        self._rebuilt = False
+        self._last_runtime = None
         
         # Ensure data directory exists
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
         os.makedirs(self.data_dir, exist_ok=True)
         self.error_log_path = os.path.join(self.data_dir, 'error.log')
+        self.error_log = ErrorLogWriter(self.error_log_path)
+
+    @property
+    def total_pings(self) -> int:
+        return self.stats.total_pings
+
+    @property
+    def failed_pings(self) -> int:
+        return self.stats.failed_pings
+
+    @property
+    def last_success(self) -> str:
+        if self.stats.last_success is None:
+            return None
+        return self.stats.last_success.strftime('%H:%M:%S')
+
+    @property
+    def recent_activity(self):
+        return self.stats.activity
 
     def normalize_proxy(self, proxy: str) -> str:
         """Normalize proxy string to consistent format."""
-        if not proxy:
-            return proxy
-        # Extract just the host:port if it's a full URL
-        if '@' in proxy:
-            return proxy.split('@')[-1].split(':')[0]
-        return proxy.split(':')[0]
+        return self.stats.normalize_proxy(proxy)
+
+    def proxy_identity(self, proxy: str) -> str:
+        """Per-proxy key for bandwidth and phase timings; 'direct' without a proxy."""
+        identity = self._identities.get(proxy)
+        if identity is None:
+            identity = self._identities[proxy] = self.stats.proxy_identity(proxy) or 'direct'
+        return identity
+
+    def mark_dirty(self, *panels):
+        """Flag panels for redraw on the next render tick."""
+        self._dirty.update(panels or self.PANELS)
 
     def generate_layout(self) -> Layout:
-        layout = Layout()
-        
+        """Return the persistent layout, rebuilding only the panels marked dirty."""
+        if self._layout is None:
+            self._layout = Layout()
+            self._layout.split(
+                Layout(name="header", size=6),
+                Layout(name="metrics", size=10),
+                Layout(name="network", size=10),
+                Layout(name="proxies", size=20),
+                Layout(name="activity")
+            )
+            self._dirty.update(self.PANELS)
+
+        runtime = self.get_runtime()
+        if runtime != self._last_runtime:
+            self._last_runtime = runtime
+            self._dirty.add("metrics")
+
+        dirty, self._dirty = self._dirty, set()
+        self._rebuilt = bool(dirty)
+        for name in dirty:
+            self._layout[name].update(getattr(self, f"_build_{name}")())
+
+        return self._layout
+
+    def _build_header(self) -> Panel:
         # Create header using Table for perfect centering
         header_table = Table(
             show_header=False,
@@ -59,7 +123,9 @@ class DisplayManager:
             padding=(1, 1),
             expand=True
         )
+        return header
 
+    def _build_metrics(self) -> Panel:
         # Enhanced metrics panel
         metrics_table = Table(box=box.SIMPLE, show_header=False, pad_edge=False)
         metrics_table.add_column("Key", style="bold cyan")
@@ -68,22 +134,41 @@ class DisplayManager:
         metrics_table.add_row("Total Pings", str(self.total_pings))
         metrics_table.add_row("Failed Pings", str(self.failed_pings))
         metrics_table.add_row("Success Rate", f"{self.get_success_rate()}%")
-        metrics_table.add_row("Proxies", f"{len(self.used_proxies)}/{self.total_proxies}")
+        metrics_table.add_row("Proxies", f"{self.stats.used_count}/{self.total_proxies}")
+        metrics_table.add_row("Task Crashes", str(self.stats.task_crashes))
+        hour = self.bandwidth.window(60)
+        metrics_table.add_row(
+            "Traffic (1h)",
+            f"{format_bytes(sum(hour))}, {self.bandwidth.share(hour, 'handshake'):.0%} handshake, "
+            f"{self.bandwidth.share(hour, 'ping', 'pong'):.0%} keepalive"
+        )
         metrics = Panel(metrics_table, title="[bold cyan]METRICS", border_style="blue")
+        return metrics
 
+    def _build_network(self) -> Panel:
         # Enhanced network status panel
         network_table = Table(box=box.SIMPLE, show_header=False, pad_edge=False)
         network_table.add_column("Key", style="bold cyan")
         network_table.add_column("Value", style="green")
         network_table.add_row("Last Success", self.last_success or "N/A")
         network_table.add_row("Active Mode", "Single Account")
+        lost = f" ({self.stats.lost_connections} lost)" if self.stats.lost_connections else ""
+        network_table.add_row("Connections", f"{self.stats.active_connections}/{self.stats.expected_connections}{lost}")
+        ramp = self.stats.fully_connected_after
+        network_table.add_row("Fully Connected", f"after {ramp:.1f}s" if ramp is not None else "Ramping up")
+        resumption = self.tls_resumption_rate()
+        network_table.add_row("TLS Resumed", f"{resumption:.0%}" if resumption is not None else "N/A")
+        slowest = self.phases.slowest_phase()
+        network_table.add_row("Slowest Phase", f"{slowest[0]} p90 {slowest[1]:.2f}s" if slowest else "N/A")
         status_style = "green bold" if self.last_success else "red bold"
         network_table.add_row("Network State", Text("Connected" if self.last_success else "Disconnected", style=status_style))
         network = Panel(network_table, title="[bold cyan]NETWORK STATUS", border_style="blue")
+        return network
 
+    def _build_activity(self) -> Panel:
         # Enhanced activity panel with colored status indicators
         activity_text = Text()
-        for activity in self.recent_activity[-30:]:
+        for activity in self.stats.activity:
             timestamp = f"[{activity['time'].strftime('%H:%M:%S')}]"
             status = "✓" if activity.get('success', False) else "✗"
             status_style = "green bold" if activity.get('success', False) else "red bold"
@@ -91,7 +176,9 @@ class DisplayManager:
             activity_text.append(f" {status} ", style=status_style)
             activity_text.append(f"{activity['message']}\n")
         activity = Panel(activity_text or "No recent activity", title="[bold cyan]RECENT ACTIVITY", border_style="blue")
+        return activity
 
+    def _build_proxies(self) -> Panel:
         # Enhanced proxy status panel with sorted proxies and inactive proxies
         proxy_table = Table(box=box.SIMPLE, show_header=True, pad_edge=False)
         proxy_table.add_column("Proxy", style="cyan", width=30)
@@ -100,86 +187,43 @@ class DisplayManager:
         proxy_table.add_column("Rate", style="yellow", justify="center")
         proxy_table.add_column("Status", style="green", justify="center")
 
-        # Normalize proxy stats to prevent duplicates
-        normalized_stats = {}
-        for proxy, stats in self.proxy_stats.items():
-            normalized_proxy = self.normalize_proxy(proxy)
-            if normalized_proxy not in normalized_stats:
-                normalized_stats[normalized_proxy] = stats.copy()  # Use copy to prevent reference issues
-            else:
-                # Combine stats if proxy appears in different formats
-                normalized_stats[normalized_proxy]["total"] += stats["total"]
-                normalized_stats[normalized_proxy]["success"] += stats["success"]
-
-        # First add failed/poor performing proxies
-        inactive_proxies = set()
-        poor_proxies = []
-        active_proxies = []
-
-        for proxy, stats in normalized_stats.items():
-            success_rate = (stats["success"] / stats["total"]) * 100 if stats["total"] > 0 else 0
-            if success_rate < 50:  # Consider proxies with <50% success rate as poor
-                poor_proxies.append((proxy, stats))
-            else:
-                active_proxies.append((proxy, stats))
-
-        # Add any unused proxies to inactive
-        for proxy in self.used_proxies:
-            normalized_proxy = self.normalize_proxy(proxy)
-            if normalized_proxy not in normalized_stats:
-                inactive_proxies.add(normalized_proxy)
-
-        # Add inactive proxies first
-        for proxy in inactive_proxies:
-            proxy_table.add_row(
-                proxy,
-                "0",
-                "0",
-                "0.0%",
-                Text("Inactive", style="red bold")
-            )
-
-        # Then add poor performing proxies
-        for proxy, stats in poor_proxies:
-            success_rate = (stats["success"] / stats["total"]) * 100
-            proxy_table.add_row(
-                proxy,
-                str(stats["success"]),
-                str(stats["total"]),
-                f"{success_rate:.1f}%",
-                Text("Poor", style="red bold")
-            )
+        # The store keeps proxies ranked (inactive, poor, then best first), so only read the visible rows
+        for proxy, success, total, group in self.stats.ranked(self.PROXY_ROWS):
+            if group == INACTIVE:
+                proxy_table.add_row(
+                    proxy,
+                    "0",
+                    "0",
+                    "0.0%",
+                    Text("Inactive", style="red bold")
+                )
+                continue
 
-        # Finally add active proxies sorted by success rate
-        sorted_active = sorted(
-            active_proxies,
-            key=lambda x: (x[1]["success"] / x[1]["total"] if x[1]["total"] > 0 else -1),
-            reverse=True  # Show best performing first
-        )
+            success_rate = (success / total) * 100
+            if group == POOR:
+                status_text, status_style = "Poor", "red bold"
+            else:
+                status_text = (
+                    "Excellent" if success_rate > 90
+                    else "Good" if success_rate > 70
+                    else "Fair"
+                )
+                status_style = (
+                    "green bold" if success_rate > 90
+                    else "yellow bold" if success_rate > 70
+                    else "yellow"
+                )
 
-        for proxy, stats in sorted_active:
-            success_rate = (stats["success"] / stats["total"]) * 100
-            status_text = (
-                "Excellent" if success_rate > 90
-                else "Good" if success_rate > 70
-                else "Fair"
-            )
-            status_style = (
-                "green bold" if success_rate > 90
-                else "yellow bold" if success_rate > 70
-                else "yellow"
-            )
-            
             proxy_table.add_row(
                 proxy,
-                str(stats["success"]),
-                str(stats["total"]),
+                str(success),
+                str(total),
                 f"{success_rate:.1f}%",
                 Text(status_text, style=status_style)
             )
 
-        working_proxies = len(active_proxies)
-        total_inactive = len(inactive_proxies) + len(poor_proxies)
+        working_proxies = self.stats.group_counts[ACTIVE]
+        total_inactive = self.stats.group_counts[INACTIVE] + self.stats.group_counts[POOR]
 
         proxies = Panel(
             proxy_table or "No active proxies", 
@@ -187,17 +231,7 @@ class DisplayManager:
             border_style="blue",
             subtitle=f"[cyan]Working: {working_proxies}/{self.total_proxies} │ Failed/Inactive: {total_inactive}"
         )
-
-        # Combine all panels with spacing
-        layout.split(
-            Layout(header, size=6),
-            Layout(metrics, size=8),
-            Layout(network, size=6),
-            Layout(proxies, size=20),
-            Layout(activity)
-        )
-
-        return layout
+        return proxies
 
     def get_runtime(self):
         delta = datetime.now() - self.start_time
@@ -210,60 +244,149 @@ class DisplayManager:
             return "0.00"
         return f"{((self.total_pings - self.failed_pings) / self.total_pings * 100):.2f}"
 
+    def snapshot(self) -> dict:
+        """Compact, JSON-ready view of what the panels show."""
+        stats = self.stats
+        ramp = stats.fully_connected_after
+        resumption = self.tls_resumption_rate()
+        slowest = self.phases.slowest_phase()
+        return {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'runtime': int((datetime.now() - self.start_time).total_seconds()),
+            'pings': stats.total_pings,
+            'failed': stats.failed_pings,
+            'success_rate': float(self.get_success_rate()),
+            'last_success': stats.last_success.isoformat(timespec='seconds') if stats.last_success else None,
+            'proxies_used': stats.used_count,
+            'proxies_total': self.total_proxies,
+            'proxies_active': stats.group_counts[ACTIVE],
+            'proxies_poor': stats.group_counts[POOR],
+            'proxies_inactive': stats.group_counts[INACTIVE],
+            'connections': stats.active_connections,
+            'expected_connections': stats.expected_connections,
+            'lost_connections': stats.lost_connections,
+            'fully_connected_after': round(ramp, 2) if ramp is not None else None,
+            'tls_resumption_rate': round(resumption, 3) if resumption is not None else None,
+            'slowest_phase': slowest[0] if slowest else None,
+            'slowest_phase_p90': round(slowest[1], 3) if slowest else None,
+            'bytes_last_hour': sum(self.bandwidth.window(60)),
+            'bytes_today': sum(self.bandwidth.totals),
+            'load_shedding_level': self.shedding_level,
+            'task_crashes': stats.task_crashes
+        }
+
     def update_display(self, live):
+        # State changes already mark their panels dirty; the render task does the drawing
+        if live:
+            self.live = live
+
+    def render(self, live):
         try:
             if live and self.is_running:
-                live.update(self.generate_layout())
+                layout = self.generate_layout()
+                if self._rebuilt:
+                    live.update(layout, refresh=True)
         except Exception as e:
             print(f"Display update error: {str(e)}")
 
+    async def run_renderer(self, live, refresh_per_second: float = None):
+        """Redraw at most refresh_per_second times, and only when something changed."""
+        if refresh_per_second:
+            self.refresh_per_second = refresh_per_second
+        self.live = live
+        while self.is_running:
+            self.render(live)
+            rate = self.SHEDDING_REFRESH if self.shedding_level else self.refresh_per_second
+            await asyncio.sleep(1 / rate)
+
+    def add_used_proxy(self, proxy: str):
+        if self.stats.mark_used(proxy):
+            self.mark_dirty("metrics", "proxies")
+
     def add_activity(self, activity_data: dict):
-        self.recent_activity.append(activity_data)
-        self.recent_activity = self.recent_activity[-30:]  # Keep only last 30 activities
+        self.stats.add_activity(activity_data)
+        self._dirty.add("activity")
         
         if activity_data.get('success', False):
-            self.last_success = activity_data['time'].strftime('%H:%M:%S')
+            self._dirty.add("network")
 
-    def log_error(self, error_message: str, proxy: str = None):
-        """Log error to file with timestamp and proxy info"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        proxy_info = f" [Proxy: {proxy}]" if proxy else ""
-        log_entry = f"[{timestamp}]{proxy_info} {error_message}\n"
-        
-        try:
-            with open(self.error_log_path, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-        except Exception as e:
-            print(f"Failed to write to error log: {str(e)}")
+    def log_error(self, error_message: str, proxy: str = None, count: int = 1):
+        """Queue error for the batched log writer with timestamp and proxy info"""
+        self.error_log.log(error_message, proxy, count)
 
-    def add_error(self, error_message: str, proxy: str = None):
+    def add_error(self, error_message: str, proxy: str = None, count: int = 1):
         # Log to file
-        self.log_error(error_message, proxy)
+        self.log_error(error_message, proxy, count)
         
-        # Add to display
-        self.recent_activity.append({
+        # Add to display; repeats from a worker batch share one activity line
+        self.stats.add_activity({
             'time': datetime.now(),
             'success': False,
-            'message': error_message,
+            'message': error_message if count == 1 else f'{error_message} (x{count})',
             'status': 'Failed'
         })
-        self.recent_activity = self.recent_activity[-30:]
-        self.failed_pings += 1
-        
-        # Update proxy stats if proxy is provided
+        self.stats.record_error(proxy, count)
+        self._dirty.update(("activity", "metrics"))
         if proxy:
-            if proxy not in self.proxy_stats:
-                self.proxy_stats[proxy] = {"total": 0, "success": 0}
-            self.proxy_stats[proxy]["total"] += 1
+            self._dirty.add("proxies")
+
+    def expect_connections(self, count: int):
+        self.stats.expect_connections(count)
+        self._dirty.add("network")
+
+    def connection_opened(self, count: int = 1):
+        if self.stats.connection_opened(count):
+            self.add_activity({
+                'time': datetime.now(),
+                'success': True,
+                'message': f'All {self.stats.expected_connections} connections up after {self.stats.fully_connected_after:.1f}s',
+                'status': 'Connected'
+            })
+        self._dirty.add("network")
+
+    def connection_closed(self, count: int = 1):
+        self.stats.connection_closed(count)
+        self._dirty.add("network")
+
+    def record_handshake(self, seconds: float, resumed: bool = None):
+        # resumed is None for plain ws:// connections
+        self.stats.handshake_time.observe(seconds)
+        if resumed is None:
+            return
+        if resumed:
+            self.stats.tls_resumed += 1
+        else:
+            self.stats.tls_full += 1
+        self._dirty.add("network")
+
+    def tls_resumption_rate(self):
+        handshakes = self.stats.tls_resumed + self.stats.tls_full
+        return self.stats.tls_resumed / handshakes if handshakes else None
+
+    def record_connection_phases(self, proxy: str, host: str, phases: dict, error: str = None, at: float = None):
+        self.phases.record(self.proxy_identity(proxy), host, phases, error, at)
+        self._dirty.add("network")
+
+    def record_bytes(self, proxy: str, account: str, category: str, sent: int, received: int):
+        self.bandwidth.add(self.proxy_identity(proxy), account, category, sent, received)
+
+    def record_reconnect(self):
+        self.stats.reconnects += 1
+
+    def set_shedding_level(self, level: int):
+        # The renderer drops to SHEDDING_REFRESH from its next tick
+        self.shedding_level = level
+
+    def record_task_crash(self, error_message: str, proxy: str = None):
+        self.stats.task_crashes += 1
+        self.add_error(error_message, proxy)
+
+    def record_lost_connections(self, count: int, error_message: str, proxy: str = None):
+        """Connections that will not come back on their own; they stay counted as expected."""
+        self.stats.lost_connections += count
+        self.add_error(error_message, proxy)
+        self._dirty.add("network")
 
     def update_stats(self, success: bool, proxy: str):
-        self.total_pings += 1
-        if not success:
-            self.failed_pings += 1
-        
-        if proxy not in self.proxy_stats:
-            self.proxy_stats[proxy] = {"total": 0, "success": 0}
-        
-        self.proxy_stats[proxy]["total"] += 1
-        if success:
-            self.proxy_stats[proxy]["success"] += 1
\ No newline at end of file
+        self.stats.record_ping(success, proxy)
+        self._dirty.update(("metrics", "proxies"))
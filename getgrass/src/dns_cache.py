@@ -0,0 +1,108 @@
+import asyncio
+import socket
+import time
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+class _DnsEntry:
+    __slots__ = ('addrs', 'error', 'expires', 'refresh_at')
+
+    def __init__(self, addrs, error, expires: float, refresh_at: float):
+        self.addrs = addrs
+        self.error = error  # (exception type, args) for a cached failure
+        self.expires = expires
+        self.refresh_at = refresh_at
+
+class DnsCache(AbstractResolver):
+    """Process-wide caching resolver shared by every connector.
+
+    Answers are kept for ttl seconds and failures for negative_ttl. A hit on
+    an answer past prefetch x ttl refreshes it in the background, so names in
+    constant use (endpoints, proxy hosts) never expire under load. Concurrent
+    misses for one name share a single lookup. Lookups go to aiohttp's
+    DefaultResolver, which is the c-ares AsyncResolver when aiodns is
+    installed and the thread-pool resolver otherwise.
+    """
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30, prefetch: float = 0.8,
+                 max_entries: int = 10000, resolver: AbstractResolver = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefetch = prefetch
+        self.max_entries = max_entries
+        self._resolver = resolver
+        self._entries = {}  # (host, port, family) -> _DnsEntry
+        self._inflight = {}  # (host, port, family) -> Task
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET):
+        key = (host, port, family)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires:
+            self.hits += 1
+            if entry.error is not None:
+                error_type, args = entry.error
+                raise error_type(*args)
+            if now >= entry.refresh_at and key not in self._inflight:
+                self.prefetches += 1
+                self._lookup(key)
+            return entry.addrs
+
+        self.misses += 1
+        return await asyncio.shield(self._lookup(key))
+
+    async def resolve_host(self, host: str, port: int = 0) -> str:
+        """First address for host, e.g. to dial a proxy by IP."""
+        addrs = await self.resolve(host, port, socket.AF_UNSPEC)
+        return addrs[0]['host']
+
+    def _lookup(self, key) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            # Runs on its own so a cancelled caller does not abort the lookup for everyone else
+            task = asyncio.create_task(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        return task
+
+    def _done(self, key, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # A failed prefetch has nobody awaiting it
+
+    async def _fetch(self, key):
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        host, port, family = key
+        try:
+            addrs = await self._resolver.resolve(host, port, family)
+        except OSError as e:
+            current = self._entries.get(key)
+            if current is not None and current.error is None and time.monotonic() < current.expires:
+                # A failed prefetch keeps serving the answer that is still valid, and backs off
+                current.refresh_at = time.monotonic() + self.negative_ttl
+                raise
+            self._store(key, _DnsEntry(None, (type(e), e.args), time.monotonic() + self.negative_ttl, float('inf')))
+            raise
+        now = time.monotonic()
+        self._store(key, _DnsEntry(addrs, None, now + self.ttl, now + self.ttl * self.prefetch))
+        return addrs
+
+    def _store(self, key, entry: _DnsEntry):
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Drop the entry closest to expiry
+            del self._entries[min(self._entries, key=lambda k: self._entries[k].expires)]
+        self._entries[key] = entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
@@ -0,0 +1,125 @@
+import asyncio
+import random
+import time
+
+class _EndpointStats:
+    __slots__ = ('host', 'rtt', 'failure_rate', 'samples', 'assigned')
+
+    def __init__(self, host: str):
+        self.host = host
+        self.rtt = None  # smoothed handshake seconds
+        self.failure_rate = 0.0  # smoothed, 0..1
+        self.samples = 0
+        self.assigned = 0
+
+class EndpointSelector:
+    """Assigns each new connection a WSS endpoint from measured handshake RTT and failures.
+
+    Real handshakes and a background prober (a few sampled routes per round)
+    feed per-endpoint moving averages. choose() draws endpoints weighted by
+    (1 - failure_rate)^4 / rtt, so a slow or failing endpoint quickly stops
+    getting new connections and wins them back once probes see it recover.
+    Every endpoint keeps at least min_share of the weight so it stays measured.
+    """
+
+    def __init__(self, hosts, probe=None, routes=None, probe_interval: float = 60,
+                 probe_sample: int = 3, probe_timeout: float = 10, smoothing: float = 0.3,
+                 min_share: float = 0.02, on_preferred=None):
+        self.endpoints = {host: _EndpointStats(host) for host in dict.fromkeys(hosts)}
+        self.probe = probe  # async probe(host, route)
+        self.routes = routes  # routes(count) -> list of routes to probe through
+        self.probe_interval = probe_interval
+        self.probe_sample = probe_sample
+        self.probe_timeout = probe_timeout
+        self.smoothing = smoothing
+        self.min_share = min_share
+        self.on_preferred = on_preferred  # on_preferred(host, stats)
+        self.preferred = None
+        self.probes = 0
+        self._task = None
+
+    def start(self):
+        if self.probe and len(self.endpoints) > 1 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def record(self, host: str, success: bool, rtt: float = None):
+        stats = self.endpoints.get(host)
+        if stats is None:
+            return
+        alpha = self.smoothing if stats.samples else 1.0
+        stats.samples += 1
+        stats.failure_rate += ((0.0 if success else 1.0) - stats.failure_rate) * alpha
+        if success and rtt is not None:
+            stats.rtt = rtt if stats.rtt is None else stats.rtt + (rtt - stats.rtt) * self.smoothing
+
+    def weights(self) -> dict:
+        known = [stats.rtt for stats in self.endpoints.values() if stats.rtt is not None]
+        # Unmeasured endpoints are assumed to be as fast as the typical measured one
+        default_rtt = sorted(known)[len(known) // 2] if known else 1.0
+        weights = {
+            host: (1.0 - stats.failure_rate) ** 4 / max(stats.rtt or default_rtt, 0.001)
+            for host, stats in self.endpoints.items()
+        }
+        total = sum(weights.values())
+        if total <= 0:
+            # Every endpoint is failing; spread the retries evenly rather than give up
+            return dict.fromkeys(weights, 1.0)
+        floor = total * self.min_share
+        return {host: max(weight, floor) for host, weight in weights.items()}
+
+    def choose(self) -> str:
+        self.start()
+        weights = self.weights()
+        host = random.choices(list(weights), weights=list(weights.values()))[0]
+        self.endpoints[host].assigned += 1
+        return host
+
+    async def _probe_one(self, host: str, route):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.probe(host, route), self.probe_timeout)
+        except Exception:
+            self.record(host, False)
+            return
+        self.record(host, True, time.monotonic() - started)
+
+    async def probe_once(self) -> bool:
+        routes = self.routes(self.probe_sample) if self.routes else [None]
+        if not routes:
+            return False
+        await asyncio.gather(*(
+            self._probe_one(host, route) for host in self.endpoints for route in routes
+        ))
+        self.probes += 1
+
+        weights = self.weights()
+        best = max(weights, key=weights.get)
+        if best != self.preferred:
+            self.preferred = best
+            if self.on_preferred:
+                self.on_preferred(best, self.endpoints[best])
+        return True
+
+    async def _run(self):
+        while True:
+            probed = await self.probe_once()
+            # Until there is a route to probe through (e.g. right after startup) retry soon
+            await asyncio.sleep(self.probe_interval if probed else min(self.probe_interval, 5))
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> list:
+        return [
+            {
+                'host': stats.host,
+                'rtt_ms': round(stats.rtt * 1000, 1) if stats.rtt is not None else None,
+                'failure_rate': round(stats.failure_rate, 3),
+                'samples': stats.samples,
+                'assigned': stats.assigned
+            }
+            for stats in self.endpoints.values()
+        ]
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+class ErrorLogWriter:
+    """Batched, deduplicating error log that keeps disk I/O off the event loop.
+
+    log() only appends to an in-memory batch. A background task flushes the
+    batch when it reaches batch_size or every flush_interval seconds, writing
+    from a worker thread and rotating the file once it exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 2.0,
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pending = {}  # (proxy, message) -> [first timestamp, count]
+        self._pending_count = 0
+        self._wakeup = None
+        self._task = None
+        self._closed = False
+        self.dropped = 0
+
+    def log(self, error_message: str, proxy: str = None, count: int = 1):
+        """Queue count occurrences of an error; repeats are written once with their count."""
+        if self._closed:
+            self.dropped += count
+            return
+
+        key = (proxy, error_message)
+        entry = self._pending.get(key)
+        if entry:
+            entry[1] += count
+        else:
+            self._pending[key] = [datetime.now(), count]
+        self._pending_count += count
+
+        self._ensure_started()
+        if self._pending_count >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop yet, entries stay queued until one is running
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _take_batch(self) -> str:
+        if not self._pending:
+            return ""
+        batch, self._pending = self._pending, {}
+        self._pending_count = 0
+
+        lines = []
+        for (proxy, error_message), (timestamp, count) in batch.items():
+            proxy_info = f" [Proxy: {proxy}]" if proxy else ""
+            repeat_info = f" (repeated {count} times)" if count > 1 else ""
+            lines.append(f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}]{proxy_info} {error_message}{repeat_info}\n")
+        return "".join(lines)
+
+    async def flush(self):
+        data = self._take_batch()
+        if data:
+            await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: str):
+        try:
+            self._rotate_if_needed()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+        except Exception as e:
+            print(f"Failed to write to error log: {str(e)}", file=sys.stderr)
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    async def close(self):
+        """Stop the background task and write out whatever is still queued."""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
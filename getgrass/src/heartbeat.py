@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import json
+import time
+import uuid
+
+def build_ping_message() -> dict:
+    return {
+        'id': str(uuid.uuid4()),
+        'version': '1.0.0',
+        'action': 'PING',
+        'data': {}
+    }
+
+class _Heartbeat:
+    __slots__ = ('websocket', 'label', 'slot', 'registered', 'last_seen', 'traffic')
+
+    def __init__(self, websocket, label: str, slot: int, traffic=None):
+        self.websocket = websocket
+        self.label = label
+        self.slot = slot
+        self.registered = self.last_seen = time.monotonic()
+        self.traffic = traffic
+
+class HeartbeatScheduler:
+    """One timing wheel that sends application PINGs for every registered socket.
+
+    The wheel has interval / tick slots and new sockets are spread over them
+    round-robin, so each socket is pinged once per interval at its own phase
+    and a single task does the work instead of one sleeping task per socket.
+    It is also the only keepalive: a socket that has received nothing for
+    dead_after seconds is closed so its connection loop reconnects.
+    """
+
+    def __init__(self, interval: float = 26, tick: float = 1.0, dead_after: float = None,
+                 on_sent=None, on_error=None):
+        self.interval = interval
+        self.tick = tick
+        self.dead_after = dead_after or interval * 2 + 10
+        self.on_sent = on_sent  # on_sent(label)
+        self.on_error = on_error  # on_error(label, exception)
+        self.slot_count = max(1, round(interval / tick))
+        self._slots = [dict() for _ in range(self.slot_count)]
+        self._cursor = 0
+        self._current = 0
+        self._task = None
+        self._inflight = set()
+        self.pings_sent = 0
+        self.dead_closed = 0
+
+    def __len__(self):
+        return sum(len(slot) for slot in self._slots)
+
+    def register(self, websocket, label: str, ping_now: bool = True, traffic=None) -> _Heartbeat:
+        slot = self._cursor
+        self._cursor = (self._cursor + 1) % self.slot_count
+        heartbeat = _Heartbeat(websocket, label, slot, traffic)
+        self._slots[slot][id(heartbeat)] = heartbeat
+        self._ensure_started()
+        if ping_now:
+            # Keep the old behaviour of pinging right after connecting
+            self._spawn(self._ping([heartbeat]))
+        return heartbeat
+
+    def unregister(self, heartbeat: _Heartbeat):
+        if heartbeat is not None:
+            self._slots[heartbeat.slot].pop(id(heartbeat), None)
+
+    def lowest_scoring(self, count: int) -> list:
+        """The count sockets worth least: silent for over an interval first, then the most recently connected."""
+        now = time.monotonic()
+        silent_after = self.interval + self.tick
+
+        def score(heartbeat):
+            return now - heartbeat.last_seen <= silent_after, now - heartbeat.registered
+        return heapq.nsmallest(count, (heartbeat for slot in self._slots for heartbeat in slot.values()), key=score)
+
+    @staticmethod
+    def touch(heartbeat: _Heartbeat):
+        """Record inbound traffic on the socket."""
+        heartbeat.last_seen = time.monotonic()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self._current = (self._current + 1) % self.slot_count
+            due = list(self._slots[self._current].values())
+            if due:
+                # Sends for a slot run on their own so one slow socket never delays the wheel
+                self._spawn(self._ping(due))
+
+    async def _ping(self, heartbeats):
+        now = time.monotonic()
+        for heartbeat in heartbeats:
+            websocket = heartbeat.websocket
+            if websocket.closed:
+                self.unregister(heartbeat)
+                continue
+            if now - heartbeat.last_seen > self.dead_after:
+                self.unregister(heartbeat)
+                self.dead_closed += 1
+                if self.on_error:
+                    self.on_error(heartbeat.label, TimeoutError(f"No traffic for {self.dead_after:.0f}s"))
+                self._spawn(websocket.close())
+                continue
+            try:
+                if heartbeat.traffic is not None:
+                    # Sample before sending, once the previous frames have been acked
+                    heartbeat.traffic.sample()
+                data = json.dumps(build_ping_message())
+                await websocket.send_str(data)
+                self.pings_sent += 1
+                if heartbeat.traffic is not None:
+                    heartbeat.traffic.sent('ping', len(data))
+                if self.on_sent:
+                    self.on_sent(heartbeat.label)
+            except Exception as e:
+                self.unregister(heartbeat)
+                if self.on_error:
+                    self.on_error(heartbeat.label, e)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        tasks = list(self._inflight) + ([self._task] if self._task else [])
+        for task in self._inflight:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        for slot in self._slots:
+            slot.clear()
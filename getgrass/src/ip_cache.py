@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+class IpInfoCache:
+    """TTL cache of egress-IP lookups per proxy, with negative caching and single-flight."""
+
+    def __init__(self, path: str, ttl: float = 3600, negative_ttl: float = 60, save_interval: float = 30):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.save_interval = save_interval
+        self._entries = {}  # key -> (expires_at, info or None)
+        self._inflight = {}  # key -> Future shared by concurrent callers
+        self._save_task = None
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @staticmethod
+    def _key(proxy: str) -> str:
+        return proxy.strip() if proxy else 'direct'
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        for key, entry in data.items():
+            expires_at = entry.get('expires_at', 0)
+            if expires_at > now and entry.get('info'):
+                self._entries[key] = (expires_at, entry['info'])
+
+    def _snapshot(self) -> dict:
+        now = time.time()
+        # Negative entries are short-lived, only persist real lookups
+        return {
+            key: {'expires_at': expires_at, 'info': info}
+            for key, (expires_at, info) in self._entries.items()
+            if info and expires_at > now
+        }
+
+    def _write(self, data: dict):
+        now = time.time()
+        # Keep entries written by other processes sharing the file (sharded runner)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+            for key, entry in existing.items():
+                if key not in data and entry.get('info') and entry.get('expires_at', 0) > now:
+                    data[key] = entry
+        except (OSError, ValueError):
+            pass
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to save IP cache: {str(e)}", file=sys.stderr)
+
+    def save(self):
+        self._write(self._snapshot())
+
+    def _schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.save_interval)
+        # Built on the loop, which keeps inserting entries; only the file work runs in a thread
+        await asyncio.to_thread(self._write, self._snapshot())
+
+    def invalidate(self, proxy: str):
+        self._entries.pop(self._key(proxy), None)
+
+    async def get(self, proxy: str, fetch):
+        """Return cached IP info for proxy, calling fetch(proxy) at most once per key on a miss."""
+        key = self._key(proxy)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.time():
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            # Run the lookup as its own task so a cancelled caller does not abort it for the others
+            task = asyncio.create_task(fetch(proxy))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+        return await asyncio.shield(task)
+
+    def _store(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        info = task.result()
+        ttl = self.ttl if info else self.negative_ttl
+        self._entries[key] = (time.time() + ttl, info)
+        if info:
+            self._schedule_save()
+
+    def __len__(self):
+        return len(self._entries)
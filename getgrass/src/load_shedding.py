@@ -0,0 +1,95 @@
+import asyncio
+import time
+from datetime import datetime
+
+NORMAL, SLOW_UI, DEFER_HANDSHAKES, PAUSE_CONNECTIONS = 0, 1, 2, 3
+LEVEL_NAMES = ('normal', 'slow UI', 'defer handshakes', 'pause connections')
+
+class LoadShedder:
+    """Steps load shedding up and down with sustained event-loop lag.
+
+    Each level keeps the ones below it: 1 slows the TUI refresh, 2 holds new
+    handshakes in the admission queue, 3 drops the lowest-scoring connections,
+    pause_fraction of them per overloaded period; their reconnects then wait
+    at admission until the level falls again. Lag above high_lag for sustain
+    seconds raises the level by one, lag below low_lag for recover seconds
+    lowers it by one, and lag in between holds it.
+    """
+
+    def __init__(self, lag_monitor, admission, display, pause_connections,
+                 high_lag: float = 0.25, low_lag: float = 0.05, sustain: float = 5,
+                 recover: float = 15, pause_fraction: float = 0.1, interval: float = 1.0):
+        self.lag_monitor = lag_monitor
+        self.admission = admission
+        self.display = display
+        self.pause_connections = pause_connections  # pause_connections(fraction) -> connections dropped
+        self.high_lag = high_lag
+        self.low_lag = low_lag
+        self.sustain = sustain
+        self.recover = recover
+        self.pause_fraction = pause_fraction
+        self.interval = interval
+        self.level = NORMAL
+        self.paused = 0  # connections dropped at the top level, ever
+        self._hot_since = None
+        self._calm_since = None
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.lag_monitor.start()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.evaluate(time.monotonic())
+
+    def evaluate(self, now: float):
+        lag = self.lag_monitor.lag
+        if lag > self.high_lag:
+            self._calm_since = None
+            if self._hot_since is None:
+                self._hot_since = now
+            elif now - self._hot_since >= self.sustain:
+                # Every further step needs another full overloaded period
+                self._hot_since = now
+                if self.level < PAUSE_CONNECTIONS:
+                    self._set_level(self.level + 1, lag)
+                else:
+                    self._pause()
+        elif lag < self.low_lag:
+            self._hot_since = None
+            if self.level == NORMAL:
+                return
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recover:
+                self._calm_since = now
+                self._set_level(self.level - 1, lag)
+        else:
+            self._hot_since = self._calm_since = None
+
+    def _set_level(self, level: int, lag: float):
+        raised = level > self.level
+        self.level = level
+        self.display.set_shedding_level(level)
+        self.admission.hold(level >= DEFER_HANDSHAKES)
+        self.display.add_activity({
+            'time': datetime.now(),
+            'success': not raised,
+            'message': f'Load shedding {"raised" if raised else "lowered"} to {LEVEL_NAMES[level]} '
+                       f'(loop lag {lag * 1000:.0f}ms)',
+            'status': 'Shedding' if level else 'Recovered'
+        })
+        if raised and level == PAUSE_CONNECTIONS:
+            self._pause()
+
+    def _pause(self):
+        self.paused += self.pause_connections(self.pause_fraction)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
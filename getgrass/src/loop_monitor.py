@@ -0,0 +1,29 @@
+import asyncio
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how much later than asked a short sleep wakes up."""
+
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.2):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0  # smoothed seconds
+        self.last_sample = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_sample = max(0.0, loop.time() - started - self.interval)
+            self.lag += (self.last_sample - self.lag) * self.smoothing
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,160 @@
+import asyncio
+from aiohttp import web
+from .stats_store import INACTIVE, POOR, ACTIVE
+from .phase_timing import PHASES
+from .bandwidth import CATEGORIES
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(families) -> str:
+    """Format (name, kind, help, label_names, samples) families as Prometheus text.
+
+    Counter and gauge samples are (label_values, value); histogram samples
+    are (label_values, (buckets, counts, sum, count)).
+    """
+    lines = []
+    for name, kind, help_text, label_names, samples in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for label_values, value in samples:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(label_names, label_values)} {_number(value)}')
+                continue
+            buckets, counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{name}_bucket{_labels(label_names, label_values, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, label_values)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(label_names, label_values)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def collect(display, bot=None, coordinator=None) -> list:
+    """Copy the current stats into metric families; cheap enough to run on the event loop."""
+    stats = display.stats
+    names = list(stats.names)
+    success = stats.success.tolist()
+    total = stats.total.tolist()
+    families = [
+        ('getgrass_pings_total', 'counter', 'Pings and messages counted by the display.', (),
+         [((), stats.total_pings)]),
+        ('getgrass_ping_failures_total', 'counter', 'Failed pings and connection errors.', (),
+         [((), stats.failed_pings)]),
+        ('getgrass_reconnects_total', 'counter', 'Reconnect attempts after a backoff.', (),
+         [((), stats.reconnects)]),
+        ('getgrass_task_crashes_total', 'counter', 'Connection tasks restarted by the supervisor.', (),
+         [((), stats.task_crashes)]),
+        ('getgrass_connections_lost_total', 'counter', 'Connections no longer restarted, e.g. given up after repeated crashes.', (),
+         [((), stats.lost_connections)]),
+        ('getgrass_active_connections', 'gauge', 'Open WebSocket connections.', (),
+         [((), stats.active_connections)]),
+        ('getgrass_expected_connections', 'gauge', 'Configured uid x proxy connections.', (),
+         [((), stats.expected_connections)]),
+        ('getgrass_proxies', 'gauge', 'Proxies by ranking group.', ('state',),
+         [(('inactive',), stats.group_counts[INACTIVE]), (('poor',), stats.group_counts[POOR]),
+          (('active',), stats.group_counts[ACTIVE])]),
+        ('getgrass_handshake_seconds', 'histogram', 'WebSocket handshake time including the proxy.', (),
+         [((), stats.handshake_time.snapshot())]),
+        ('getgrass_connect_phase_seconds', 'histogram', 'Connection setup time per phase.', ('phase',),
+         [((phase,), display.phases.overall[phase].snapshot()) for phase in PHASES]),
+        ('getgrass_bytes_total', 'counter', 'Bytes through proxies and direct sockets by traffic category.',
+         ('category', 'direction'),
+         [((category, direction), display.bandwidth.lifetime[index * 2 + offset])
+          for index, category in enumerate(CATEGORIES)
+          for offset, direction in enumerate(('sent', 'received'))]),
+        ('getgrass_tls_handshakes_total', 'counter', 'TLS handshakes to WSS endpoints by outcome.', ('result',),
+         [(('resumed',), stats.tls_resumed), (('full',), stats.tls_full)]),
+        ('getgrass_proxy_pings_total', 'counter', 'Pings per proxy.', ('proxy',),
+         [((name,), count) for name, count in zip(names, total)]),
+        ('getgrass_proxy_ping_success_total', 'counter', 'Successful pings per proxy.', ('proxy',),
+         [((name,), count) for name, count in zip(names, success)]),
+    ]
+    if stats.fully_connected_after is not None:
+        families.append(('getgrass_fully_connected_seconds', 'gauge',
+                         'Time from start until every connection was first up.', (),
+                         [((), stats.fully_connected_after)]))
+
+    if bot is not None:
+        # Process-local state; not available on the coordinator of a sharded run
+        families += [
+            ('getgrass_handshake_limit', 'gauge', 'Current admission limit for concurrent handshakes.', (),
+             [((), bot.admission.limit)]),
+            ('getgrass_handshakes_in_flight', 'gauge', 'Handshakes holding an admission slot.', (),
+             [((), bot.admission.in_flight)]),
+            ('getgrass_event_loop_lag_seconds', 'gauge', 'Smoothed event-loop scheduling lag.', (),
+             [((), bot.loop_monitor.lag)]),
+            ('getgrass_load_shedding_level', 'gauge',
+             'Load shedding level: 0 off, 1 slow UI, 2 defer handshakes, 3 pause connections.', (),
+             [((), bot.shedder.level)]),
+            ('getgrass_connections_paused_total', 'counter', 'Connections dropped by load shedding.', (),
+             [((), bot.shedder.paused)]),
+            ('getgrass_reconnects_throttled_total', 'counter', 'Reconnects delayed by the fleet-wide rate cap.', (),
+             [((), bot.reconnects.throttled)]),
+            ('getgrass_dns_lookups_total', 'counter', 'Shared DNS cache lookups by result.', ('result',),
+             [(('hit',), bot.dns.hits), (('miss',), bot.dns.misses), (('prefetch',), bot.dns.prefetches)]),
+            ('getgrass_endpoint_rtt_seconds', 'gauge', 'Smoothed handshake RTT per WSS endpoint.', ('endpoint',),
+             [((e.host,), e.rtt) for e in bot.endpoints.endpoints.values() if e.rtt is not None]),
+            ('getgrass_server_tls_handshakes_total', 'counter', 'TLS handshakes per WSS server name by outcome.',
+             ('server', 'result'),
+             [((host, 'resumed'), count) for host, count in bot.config.ssl_context.resumed.items()]
+             + [((host, 'full'), count) for host, count in bot.config.ssl_context.full.items()]),
+            ('getgrass_endpoint_failure_ratio', 'gauge', 'Smoothed handshake failure rate per WSS endpoint.',
+             ('endpoint',), [((e.host,), e.failure_rate) for e in bot.endpoints.endpoints.values()]),
+        ]
+    if coordinator is not None:
+        # Sharded runs: the same process-local load figures, as last reported by each worker
+        load = sorted(coordinator.load_states().items())
+        families += [
+            ('getgrass_worker_event_loop_lag_seconds', 'gauge', 'Smoothed event-loop lag per worker.', ('worker',),
+             [((str(worker),), lag) for worker, (lag, _, _) in load]),
+            ('getgrass_worker_load_shedding_level', 'gauge', 'Load shedding level per worker.', ('worker',),
+             [((str(worker),), level) for worker, (_, level, _) in load]),
+            ('getgrass_worker_connections_paused_total', 'counter', 'Connections dropped by load shedding per worker.',
+             ('worker',), [((str(worker),), paused) for worker, (_, _, paused) in load]),
+        ]
+    return families
+
+class MetricsServer:
+    """Local /metrics endpoint in the Prometheus text exposition format.
+
+    Stats are copied on the event loop and formatted in a worker thread, so
+    a scrape of a large fleet does not stall the connections.
+    """
+
+    def __init__(self, collect_families, host: str = '127.0.0.1', port: int = 9109):
+        self.collect_families = collect_families
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle(self, request):
+        families = self.collect_families()
+        body = await asyncio.to_thread(render, families)
+        return web.Response(body=body.encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from .stats_store import Histogram
+
+# Connection setup steps, in order
+PHASES = ('ip_check', 'tcp', 'socks', 'tls', 'upgrade', 'auth')
+# Finer than the handshake histogram: single phases are often a few milliseconds
+PHASE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current = contextvars.ContextVar('getgrass_connection_attempt', default=None)
+
+def current_attempt():
+    """The attempt being tracked by this task, for hooks inside the connector and SSL context."""
+    return _current.get()
+
+class ConnectionAttempt:
+    """Wall time spent in each setup phase of one connection attempt.
+
+    mark() charges the time since the previous mark to a phase. While
+    track() is active the proxy connector, the SSL context and the session
+    trace mark the TCP, SOCKS and TLS boundaries; the bot marks the rest.
+    """
+
+    __slots__ = ('proxy', 'host', 'started', 'phases', 'error', 'finished', '_last', '_tls')
+
+    def __init__(self, proxy: str = None, host: str = None):
+        self.proxy = proxy
+        self.host = host
+        self.started = self._last = time.monotonic()
+        self.phases = {}
+        self.error = None
+        self.finished = False
+        self._tls = False
+
+    def mark(self, phase: str):
+        now = time.monotonic()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def tls_started(self):
+        # Direct sockets start TLS right after the TCP connect, proxied ones after the SOCKS handshake
+        self.mark('socks' if self.proxy else 'tcp')
+        self._tls = True
+
+    def connected(self):
+        """The transport is ready for HTTP; closes the TLS phase, or the tunnel phase for ws://."""
+        self.mark('tls' if self._tls else ('socks' if self.proxy else 'tcp'))
+
+    @contextlib.contextmanager
+    def track(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+class PhaseStats:
+    """Per-phase latency histograms, fleet-wide and per proxy, plus the slowest attempts seen."""
+
+    def __init__(self, slowest: int = 20):
+        self.slowest_size = slowest
+        self.overall = {phase: Histogram(PHASE_BUCKETS) for phase in PHASES}
+        self.per_proxy = {}  # proxy name -> {phase: Histogram}
+        self.attempts = 0
+        self.failures = 0
+        self._slowest = []  # min-heap of (total, seq, record)
+        self._seq = itertools.count()
+
+    def record(self, proxy: str, host: str, phases: dict, error: str = None, at: float = None):
+        self.attempts += 1
+        if error:
+            self.failures += 1
+        histograms = self.per_proxy.get(proxy)
+        if histograms is None:
+            histograms = self.per_proxy[proxy] = {}
+        for phase, seconds in phases.items():
+            self.overall[phase].observe(seconds)
+            histogram = histograms.get(phase)
+            if histogram is None:
+                histogram = histograms[phase] = Histogram(PHASE_BUCKETS)
+            histogram.observe(seconds)
+
+        total = sum(phases.values())
+        if len(self._slowest) < self.slowest_size or total > self._slowest[0][0]:
+            record = {
+                'time': datetime.fromtimestamp(at or time.time()).isoformat(timespec='seconds'),
+                'proxy': proxy,
+                'host': host,
+                'total': round(total, 3),
+                'phases': {phase: round(seconds, 3) for phase, seconds in phases.items()},
+                'error': error
+            }
+            item = (total, next(self._seq), record)
+            if len(self._slowest) < self.slowest_size:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> list:
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def slowest_phase(self, q: float = 0.9):
+        """(phase, seconds) with the highest q-quantile, or None before the first attempt."""
+        quantiles = [(self.overall[phase].quantile(q), phase) for phase in PHASES if self.overall[phase].count]
+        if not quantiles:
+            return None
+        seconds, phase = max(quantiles)
+        return phase, seconds
+
+    def report(self) -> dict:
+        def summary(histogram):
+            return {
+                'count': histogram.count,
+                'mean': round(histogram.sum / histogram.count, 3),
+                'p50': round(histogram.quantile(0.5), 3),
+                'p90': round(histogram.quantile(0.9), 3)
+            }
+        return {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'phases': {phase: summary(h) for phase, h in self.overall.items() if h.count},
+            'proxies': {
+                proxy: {phase: summary(h) for phase, h in histograms.items()}
+                for proxy, histograms in self.per_proxy.items()
+            },
+            'slowest': self.slowest()
+        }
+
+class PhaseReportWriter:
+    """Periodically rewrite the phase report as one JSON file in data/."""
+
+    def __init__(self, phases: PhaseStats, path: str, interval: float = 60):
+        self.phases = phases
+        self.path = path
+        self.interval = interval
+
+    def _write(self, report: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to save connection phase report: {str(e)}", file=sys.stderr)
+
+    def save(self):
+        if self.phases.attempts:
+            self._write(self.phases.report())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.phases.attempts:
+                # Built on the loop so the histograms are not read mid-update; only the write is off-loop
+                await asyncio.to_thread(self._write, self.phases.report())
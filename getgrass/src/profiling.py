@@ -0,0 +1,206 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+_COROUTINE_FLAGS = inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR | inspect.CO_ITERABLE_COROUTINE
+IDLE, CALLBACKS = '<idle>', '<callbacks>'
+
+def _frame_name(code, line: int = None) -> str:
+    location = f"{os.path.basename(code.co_filename)}:{line or code.co_firstlineno}"
+    # co_qualname is Python 3.11+
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({location})"
+
+def _attribute(frame) -> tuple:
+    """(owner, leaf) for one stack: the outermost coroutine is the task the time belongs to."""
+    leaf = _frame_name(frame.f_code, frame.f_lineno)
+    if frame.f_code.co_name in ('select', 'poll') and frame.f_code.co_filename.endswith('selectors.py'):
+        return IDLE, leaf
+    owner = None
+    while frame is not None:
+        if frame.f_code.co_flags & _COROUTINE_FLAGS:
+            owner = frame.f_code
+        frame = frame.f_back
+    return (_frame_name(owner) if owner else CALLBACKS), leaf
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack from a helper thread.
+
+    Each interval's wall time, and the loop thread's CPU time where the
+    platform exposes per-thread clocks, is charged to the coroutine that
+    was running: the task's outermost coroutine, '<callbacks>' for plain
+    loop callbacks and '<idle>' while the loop waits in its selector. A
+    coroutine whose wall time is well above its CPU time is blocking the loop.
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.005, top_frames: int = 5):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top_frames = top_frames
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, on_done=None) -> bool:
+        """Profile the calling loop's thread for seconds; on_done(path) runs on the loop afterwards."""
+        if self.running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(threading.get_ident(), seconds, asyncio.get_running_loop(), on_done),
+            name='getgrass-profiler',
+            daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """End the current run early; its report is still written."""
+        self._stop.set()
+
+    @staticmethod
+    def _cpu_clock(thread_id: int):
+        try:
+            clock = time.pthread_getcpuclockid(thread_id)
+            time.clock_gettime(clock)
+        except (AttributeError, OSError):
+            return None  # No per-thread CPU clocks here; only wall time is reported
+        return lambda: time.clock_gettime(clock)
+
+    def _run(self, thread_id: int, seconds: float, loop, on_done):
+        cpu = self._cpu_clock(thread_id)
+        owners = {}  # owner -> [wall, cpu, samples, {leaf: samples}]
+        started = time.time()
+        last_wall = time.perf_counter()
+        deadline = last_wall + seconds
+        last_cpu = cpu() if cpu else 0.0
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            now = time.perf_counter()
+            now_cpu = cpu() if cpu else 0.0
+            if frame is None:
+                break  # The loop thread is gone
+            owner, leaf = _attribute(frame)
+            del frame
+            entry = owners.get(owner)
+            if entry is None:
+                entry = owners[owner] = [0.0, 0.0, 0, {}]
+            entry[0] += now - last_wall
+            entry[1] += now_cpu - last_cpu
+            entry[2] += 1
+            entry[3][leaf] = entry[3].get(leaf, 0) + 1
+            last_wall, last_cpu = now, now_cpu
+            if now >= deadline:
+                break
+
+        path = self._write(self._report(owners, started, cpu is not None))
+        if on_done and path:
+            try:
+                loop.call_soon_threadsafe(on_done, path)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def _report(self, owners: dict, started: float, has_cpu: bool) -> dict:
+        duration = sum(entry[0] for entry in owners.values())
+        idle = owners.get(IDLE, (0.0,))[0]
+        return {
+            'pid': os.getpid(),
+            'started': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+            'duration': round(duration, 3),
+            'interval': self.interval,
+            'cpu_clock': has_cpu,
+            'loop_busy': round(1 - idle / duration, 3) if duration else 0.0,
+            'coroutines': [
+                {
+                    'name': owner,
+                    'wall': round(wall, 4),
+                    'cpu': round(cpu_time, 4) if has_cpu else None,
+                    'samples': samples,
+                    'wall_share': round(wall / duration, 4) if duration else 0.0,
+                    'top': sorted(leaves.items(), key=lambda item: item[1], reverse=True)[:self.top_frames]
+                }
+                for owner, (wall, cpu_time, samples, leaves)
+                in sorted(owners.items(), key=lambda item: item[1][0], reverse=True)
+            ]
+        }
+
+    def _write(self, report: dict):
+        path = os.path.join(
+            self.output_dir, f"profile-{report['pid']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=1)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to write profile: {str(e)}", file=sys.stderr)
+            return None
+        return path
+
+class RuntimeProfile:
+    """Loop settings for one process; plain attributes so worker processes get a copy.
+
+    The production profile leaves asyncio debug mode off. The debug profile
+    turns it on and logs callbacks slower than slow_callback seconds. Either
+    way SIGUSR1 toggles the sampling profiler for profile_seconds.
+    """
+
+    def __init__(self, data_dir: str, debug: bool = False, slow_callback: float = 0.1,
+                 profile_seconds: float = 30, sample_interval: float = 0.005):
+        self.data_dir = data_dir
+        self.debug = debug
+        self.slow_callback = slow_callback
+        self.profile_seconds = profile_seconds
+        self.sample_interval = sample_interval
+
+    def apply(self, loop):
+        loop.set_debug(self.debug)
+        if not self.debug:
+            return
+        loop.slow_callback_duration = self.slow_callback
+        # Slow-callback and never-awaited warnings go to a file; the TUI owns the terminal
+        os.makedirs(self.data_dir, exist_ok=True)
+        handler = logging.FileHandler(os.path.join(self.data_dir, 'asyncio_debug.log'), encoding='utf-8')
+        handler.setFormatter(logging.Formatter(f'%(asctime)s [{os.getpid()}] %(levelname)s %(message)s'))
+        logger = logging.getLogger('asyncio')
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+
+    def install_profiler(self, on_event=None, on_signal=None) -> SamplingProfiler:
+        """Toggle a profiling run on SIGUSR1; on_event(message) reports starts and finished files.
+
+        on_signal() is called on every SIGUSR1 as well, e.g. to pass it on to worker processes.
+        """
+        profiler = SamplingProfiler(os.path.join(self.data_dir, 'profiles'), self.sample_interval)
+
+        def on_done(path):
+            if on_event:
+                on_event(f'Profile written to {path}')
+
+        def toggle():
+            if on_signal:
+                on_signal()
+            if profiler.running:
+                profiler.stop()
+            elif profiler.start(self.profile_seconds, on_done) and on_event:
+                on_event(f'Profiling for {self.profile_seconds:g}s (SIGUSR1 again to stop early)')
+
+        sigusr1 = getattr(signal, 'SIGUSR1', None)
+        if sigusr1 is not None:
+            try:
+                asyncio.get_running_loop().add_signal_handler(sigusr1, toggle)
+            except (NotImplementedError, RuntimeError):
+                pass
+        return profiler
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+import sys
+
+SOCKS5, HTTP = 'socks5', 'http'
+PROTOCOLS = (SOCKS5, HTTP)
+
+class ProtocolCache:
+    """Last protocol that worked for each proxy, persisted across restarts."""
+
+    def __init__(self, path: str, save_interval: float = 30):
+        self.path = path
+        self.save_interval = save_interval
+        self._protocols = {}
+        self._save_task = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._protocols = {proxy: protocol for proxy, protocol in data.items() if protocol in PROTOCOLS}
+
+    def _write(self, protocols: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(protocols, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to save protocol cache: {str(e)}", file=sys.stderr)
+
+    def save(self):
+        self._write(dict(self._protocols))
+
+    def _schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.save_interval)
+        # Copied on the loop so record()/forget() cannot change it mid-dump
+        await asyncio.to_thread(self._write, dict(self._protocols))
+
+    def order(self, proxy: str) -> tuple:
+        """Protocols to try for proxy, last known good first, else the scheme it was written with."""
+        known = self._protocols.get(proxy)
+        if known is None:
+            known = HTTP if proxy.startswith('http://') else SOCKS5
+        return (known,) + tuple(p for p in PROTOCOLS if p != known)
+
+    def get(self, proxy: str) -> str:
+        return self._protocols.get(proxy)
+
+    def record(self, proxy: str, protocol: str):
+        if self._protocols.get(proxy) != protocol:
+            self._protocols[proxy] = protocol
+            self._schedule_save()
+
+    def forget(self, proxy: str):
+        if self._protocols.pop(proxy, None) is not None:
+            self._schedule_save()
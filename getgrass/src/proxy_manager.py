@@ -1,26 +1,90 @@
+import asyncio
 import json
 import os
+import sys
 from colorama import Fore
 
 # Get the absolute path to the project root directory
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-async def read_lines(filename: str) -> list[str]:
+# Schemes the proxy connector can tunnel through; others are rejected rather than dialed as SOCKS5
+PROXY_SCHEMES = ('socks5://', 'http://')
+
+def resolve_path(filename: str) -> str:
+    # Handle path resolution
+    if os.path.isabs(filename):
+        return filename
+    return os.path.join(ROOT_DIR, filename)
+
+def parse_proxy_line(line: str) -> str:
+    """Return the cleaned proxy for a line, or None if it is blank, a comment or malformed."""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    address = line
+    for scheme in PROXY_SCHEMES:
+        if address.startswith(scheme):
+            address = address[len(scheme):]
+            break
+    if '://' in address:
+        return None
+
+    if '@' in address:
+        auth, address = address.rsplit('@', 1)
+        if ':' not in auth:
+            return None
+
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit() or not 0 < int(port) < 65536:
+        return None
+    return line
+
+def parse_uid_line(line: str) -> str:
+    line = line.strip()
+    if not line or line.startswith('#') or any(c.isspace() for c in line):
+        return None
+    return line
+
+def iter_lines(file_path: str, parser=None, rejected: list = None):
+    """Lazily yield parsed, deduplicated lines; malformed lines are appended to rejected."""
+    seen = set()
+    with open(file_path, 'r') as f:
+        for raw in f:
+            if parser:
+                line = parser(raw)
+                if line is None:
+                    stripped = raw.strip()
+                    if rejected is not None and stripped and not stripped.startswith('#'):
+                        rejected.append(stripped)
+                    continue
+            else:
+                line = raw.strip()
+                if not line:
+                    continue
+            if line not in seen:
+                seen.add(line)
+                yield line
+
+def _load_lines(file_path: str, parser=None) -> tuple:
+    rejected = []
+    lines = list(iter_lines(file_path, parser, rejected))
+    return lines, len(rejected)
+
+async def read_lines(filename: str, parser=None) -> list[str]:
     try:
-        # Handle path resolution
-        if os.path.isabs(filename):
-            file_path = filename
-        else:
-            file_path = os.path.join(ROOT_DIR, filename)
+        file_path = resolve_path(filename)
 
         if not os.path.exists(file_path):
             print(f'{Fore.RED}File not found: {file_path}')
             return []
-            
-        with open(file_path, 'r') as f:
-            lines = [line.strip() for line in f if line.strip()]
-            print(f'{Fore.GREEN}Successfully loaded {len(lines)} lines from {filename}')
-            return lines
+
+        # Read off the event loop so large files do not stall running connections
+        lines, invalid = await asyncio.to_thread(_load_lines, file_path, parser)
+        print(f'{Fore.GREEN}Successfully loaded {len(lines)} lines from {filename}')
+        if invalid:
+            print(f'{Fore.YELLOW}Skipped {invalid} invalid lines in {filename}')
+        return lines
     except Exception as e:
         print(f'{Fore.RED}Failed to read {filename}: {str(e)}')
         return []
@@ -42,5 +106,98 @@ def auto_detect_proxy_source() -> dict:
     # If no proxy file or empty file, use direct connection
     return {'type': 'none'}
 
+class SourceWatcher:
+    """Watches proxy.txt and uid.txt and reports (uid, proxy) pairs added or removed.
+
+    A pair's proxy is None when there are no proxies (direct connection mode).
+    on_change(added, removed) is called with sets of pairs after every change.
+    on_event(message) gets skipped reloads and read errors; without it they go to stderr.
+    """
+
+    def __init__(self, on_change, proxy_file: str = 'data/proxy.txt',
+                 uid_file: str = 'data/uid.txt', interval: float = 5.0, on_event=None):
+        self.on_change = on_change
+        self.on_event = on_event
+        self.proxy_path = resolve_path(proxy_file)
+        self.uid_path = resolve_path(uid_file)
+        self.interval = interval
+        self.pairs = set()
+        self.proxies = []
+        self.user_ids = []
+        self._signature = None
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _report(self, message: str):
+        if self.on_event:
+            self.on_event(message)
+        else:
+            print(message, file=sys.stderr)
+
+    def _current_signature(self):
+        return self._stat(self.proxy_path), self._stat(self.uid_path)
+
+    def _load(self):
+        proxies = []
+        if os.path.exists(self.proxy_path):
+            proxies, _ = _load_lines(self.proxy_path, parse_proxy_line)
+        user_ids = []
+        if os.path.exists(self.uid_path):
+            user_ids, _ = _load_lines(self.uid_path, parse_uid_line)
+        return proxies, user_ids
+
+    @staticmethod
+    def build_pairs(user_ids, proxies) -> set:
+        return {(user_id, proxy) for user_id in user_ids for proxy in (proxies or [None])}
+
+    def prime(self, user_ids, proxies):
+        """Record what is already running so the first check only reports real changes."""
+        self.user_ids = list(user_ids)
+        self.proxies = list(proxies)
+        self.pairs = self.build_pairs(user_ids, proxies)
+        self._signature = self._current_signature()
+
+    async def check(self) -> bool:
+        signature = await asyncio.to_thread(self._current_signature)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        proxies, user_ids = await asyncio.to_thread(self._load)
+        if not user_ids:
+            # Keep running the current fleet rather than dropping everything on a half-written file
+            self._report('uid file is empty or missing, keeping current connections')
+            return False
+        if self.proxies and not proxies:
+            # An empty or half-written proxy file would move every connection to direct mode and expose the host IP
+            self._report('proxy file is empty or missing, keeping current connections '
+                         '(restart to switch to direct mode)')
+            return False
+
+        pairs = self.build_pairs(user_ids, proxies)
+        added = pairs - self.pairs
+        removed = self.pairs - pairs
+        self.pairs, self.proxies, self.user_ids = pairs, proxies, user_ids
+        if added or removed:
+            self.on_change(added, removed)
+        return bool(added or removed)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self._report(f'Failed to reload proxy/uid files: {str(e)}')
+
 # Only keep this line for exports
-__all__ = ['read_lines', 'auto_detect_proxy_source']
\ No newline at end of file
+__all__ = [
+    'read_lines', 'auto_detect_proxy_source', 'iter_lines',
+    'parse_proxy_line', 'parse_uid_line', 'SourceWatcher'
+]
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from .stats_store import StatsStore
+
+class ProxyStateSnapshot:
+    """Per-proxy counters and circuit breaker state in one JSON file, for warm restarts.
+
+    The file is rewritten every interval and on shutdown. On start, load()
+    puts the counters back into the StatsStore and returns the breaker
+    states for the caller to restore, so proxies that were failing start in
+    backoff instead of being rediscovered by timing out on them.
+    """
+
+    def __init__(self, stats: StatsStore, health_source, path: str, interval: float = 60,
+                 max_age: float = 86400):
+        self.stats = stats
+        self.health_source = health_source  # () -> ProxyHealth.export()-style dict
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+
+    def report(self) -> dict:
+        return {
+            'saved_at': time.time(),
+            'proxies': {
+                proxy: [counts['success'], counts['total']]
+                for proxy, counts in self.stats.proxy_snapshot().items() if counts['total']
+            },
+            'health': self.health_source()
+        }
+
+    def load(self, proxies=None) -> dict:
+        """Restore every counter and return the breaker states of the given raw proxies (all if None).
+
+        Counters are not filtered: ping successes are recorded under the
+        egress IP rather than the configured proxy, so no proxy list matches them.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Failed to load proxy state from {self.path}: {str(e)}", file=sys.stderr)
+            return {}
+        if time.time() - snapshot.get('saved_at', 0) > self.max_age:
+            return {}
+
+        if proxies is not None:
+            proxies = set(proxies)
+        for name, (success, total) in snapshot.get('proxies', {}).items():
+            self.stats.merge(name, success, total)
+        return {
+            proxy: state for proxy, state in snapshot.get('health', {}).items()
+            if proxies is None or proxy in proxies
+        }
+
+    def _write(self, report: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to save proxy state: {str(e)}", file=sys.stderr)
+
+    def save(self):
+        self._write(self.report())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Built on the loop so the counters are not read mid-update; only the write is off-loop
+            await asyncio.to_thread(self._write, self.report())
@@ -0,0 +1,75 @@
+import asyncio
+import random
+import time
+
+class Backoff:
+    """Per-connection exponential backoff with decorrelated jitter."""
+
+    def __init__(self, base: float, cap: float, multiplier: float):
+        self.base = base
+        self.cap = cap
+        self.multiplier = multiplier
+        self.attempts = 0
+        self._last = 0.0
+
+    def reset(self):
+        self.attempts = 0
+        self._last = 0.0
+
+    def next_delay(self) -> float:
+        self.attempts += 1
+        if self._last <= 0:
+            # First retry after a healthy period: spread the herd over one base interval
+            self._last = random.uniform(0, self.base)
+        else:
+            # Decorrelated jitter, bounded by an exponential envelope of base * multiplier^attempts
+            ceiling = min(self.cap, self.base * self.multiplier ** min(self.attempts, 64))
+            self._last = min(ceiling, random.uniform(self.base, max(self.base, self._last) * 3))
+        return self._last
+
+class ReconnectScheduler:
+    """Hands out per-connection backoffs and caps reconnects per second fleet-wide."""
+
+    def __init__(self, config, on_reconnect=None):
+        self.config = config
+        self.on_reconnect = on_reconnect
+        self.rate = config.max_reconnects_per_second
+        self.burst = config.reconnect_burst
+        self._tat = 0.0  # theoretical arrival time of the next reconnect slot
+        self.total_reconnects = 0
+        self.throttled = 0
+        self.stopped = False
+
+    def backoff(self) -> Backoff:
+        return Backoff(
+            self.config.min_retry_interval,
+            self.config.max_retry_interval,
+            self.config.retry_multiplier
+        )
+
+    def _reserve_slot(self) -> float:
+        """Reserve the next global slot and return how long to wait for it."""
+        if not self.rate:
+            return 0.0
+        interval = 1 / self.rate
+        now = time.monotonic()
+        tat = max(self._tat, now)
+        self._tat = tat + interval
+        return max(0.0, tat - interval * (self.burst - 1) - now)
+
+    def stop(self):
+        """Hold every wait() from now on until its task is cancelled, so nothing reconnects during shutdown."""
+        self.stopped = True
+
+    async def wait(self, backoff: Backoff):
+        await asyncio.sleep(backoff.next_delay())
+        delay = self._reserve_slot()
+        if delay > 0:
+            self.throttled += 1
+            await asyncio.sleep(delay)
+        if self.stopped:
+            # Parked until the shutdown drain cancels the connection task
+            await asyncio.get_running_loop().create_future()
+        self.total_reconnects += 1
+        if self.on_reconnect:
+            self.on_reconnect()
@@ -0,0 +1,200 @@
+import asyncio
+import random
+import time
+import aiohttp
+import aiohttp_socks
+import python_socks
+from aiohttp_socks.connector import _ResponseHandler
+from python_socks.async_.asyncio.v2 import Proxy
+from python_socks.async_.asyncio.v2._connect import connect_tcp
+from .phase_timing import current_attempt
+
+class _SessionEntry:
+    __slots__ = ('session', 'leases', 'last_used')
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+class _TimedTcp:
+    """First hop for python-socks that opens the TCP socket to the proxy and marks when it is up.
+
+    python-socks has no public hook for this; connect_tcp and the stream it
+    returns are internals of the pinned version in requirements.txt.
+    """
+
+    def __init__(self, attempt):
+        self.attempt = attempt
+
+    async def connect(self, dest_host, dest_port):
+        try:
+            stream = await connect_tcp(dest_host, dest_port, asyncio.get_running_loop())
+        except OSError as e:
+            # python-socks only wraps this error when it opens the socket itself
+            raise python_socks.ProxyConnectionError(
+                e.errno, f"Couldn't connect to proxy {dest_host}:{dest_port} [{e.strerror}]"
+            ) from e
+        self.attempt.mark('tcp')
+        return stream
+
+class _ResolvingProxyConnector(aiohttp_socks.ProxyConnector):
+    """ProxyConnector that resolves the proxy through the shared DNS cache and times the tunnel.
+
+    It overrides _connect_via_proxy and swaps _proxy_host, which are not
+    public API; requirements.txt pins aiohttp-socks to the version this matches.
+    """
+
+    def __init__(self, *args, dns_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dns_cache = dns_cache
+        self._proxy_hostname = self._proxy_host
+
+    async def _connect_via_proxy(self, host, port, ssl=None, timeout=None):
+        if self._dns_cache is not None:
+            # python-socks would otherwise resolve the proxy on the default executor for every socket
+            self._proxy_host = await self._dns_cache.resolve_host(self._proxy_hostname, self._proxy_port)
+        attempt = current_attempt()
+        if attempt is None:
+            return await super()._connect_via_proxy(host, port, ssl=ssl, timeout=timeout)
+
+        # Same as ProxyConnector._connect_via_proxy, with the TCP hop split out so SOCKS time is separate
+        proxy = Proxy(
+            proxy_type=self._proxy_type,
+            host=self._proxy_host,
+            port=self._proxy_port,
+            username=self._proxy_username,
+            password=self._proxy_password,
+            rdns=self._rdns,
+            proxy_ssl=self._proxy_ssl,
+            forward=_TimedTcp(attempt)
+        )
+        stream = await proxy.connect(dest_host=host, dest_port=port, dest_ssl=ssl, timeout=timeout)
+        transport = stream.writer.transport
+        protocol = _ResponseHandler(loop=self._loop, writer=stream.writer)
+        transport.set_protocol(protocol)
+        protocol.connection_made(transport)
+        return transport, protocol
+
+async def _on_connection_create_end(session, trace_config_ctx, params):
+    attempt = current_attempt()
+    if attempt is not None:
+        attempt.connected()
+
+def _trace_configs() -> list:
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    return [trace_config]
+
+class SessionRegistry:
+    """Shared aiohttp sessions keyed by proxy, reused across reconnects."""
+
+    def __init__(self, max_sessions: int = 2048, idle_timeout: float = 300, sweep_interval: float = 30,
+                 dns_cache=None):
+        self.max_sessions = max_sessions
+        self.dns_cache = dns_cache
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._entries = {}
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def format_proxy(proxy: str, protocol: str = None) -> str:
+        """Proxy URL for the connector; protocol ('socks5' or 'http') replaces whatever scheme the line had."""
+        formatted_proxy = proxy.strip()
+        if protocol:
+            return f"{protocol}://{formatted_proxy.split('://', 1)[-1]}"
+        if not formatted_proxy.startswith(('socks5://', 'http://')):
+            formatted_proxy = f'socks5://{formatted_proxy}'
+        return formatted_proxy
+
+    def _create_session(self, proxy: str = None) -> aiohttp.ClientSession:
+        if not proxy:
+            # The direct session is shared by every direct socket, so no pool cap either
+            if self.dns_cache is None:
+                connector = aiohttp.TCPConnector(limit=0)
+            else:
+                connector = aiohttp.TCPConnector(limit=0, resolver=self.dns_cache, use_dns_cache=False)
+            return aiohttp.ClientSession(connector=connector, trace_configs=_trace_configs())
+
+        # One connector per proxy; limit=0 so every uid sharing the proxy can hold a socket
+        connector = _ResolvingProxyConnector.from_url(
+            self.format_proxy(proxy),
+            rdns=True,
+            limit=0,
+            dns_cache=self.dns_cache
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=_trace_configs())
+
+    async def acquire(self, proxy: str = None) -> aiohttp.ClientSession:
+        key = self.format_proxy(proxy) if proxy else None
+        await self._maybe_sweep()
+
+        entry = self._entries.get(key)
+        if entry is None or entry.session.closed:
+            if len(self._entries) >= self.max_sessions:
+                await self._evict_lru()
+            entry = _SessionEntry(self._create_session(key))
+            self._entries[key] = entry
+
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        return entry.session
+
+    def release(self, proxy: str = None):
+        key = self.format_proxy(proxy) if proxy else None
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.leases = max(0, entry.leases - 1)
+        entry.last_used = time.monotonic()
+
+    async def discard(self, proxy: str = None):
+        """Close and forget the session for a proxy, e.g. after it was reconfigured."""
+        key = self.format_proxy(proxy) if proxy else None
+        entry = self._entries.pop(key, None)
+        if entry and not entry.session.closed:
+            await entry.session.close()
+
+    def sample_keys(self, count: int) -> list:
+        """Up to count keys of open sessions, preferring proxies over the direct session."""
+        keys = [key for key, entry in self._entries.items() if not entry.session.closed]
+        proxied = [key for key in keys if key is not None]
+        keys = proxied or keys
+        return random.sample(keys, min(count, len(keys)))
+
+    async def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+
+        idle_keys = [
+            key for key, entry in self._entries.items()
+            if entry.leases == 0 and now - entry.last_used > self.idle_timeout
+        ]
+        for key in idle_keys:
+            entry = self._entries.pop(key)
+            if not entry.session.closed:
+                await entry.session.close()
+
+    async def _evict_lru(self):
+        # Only sessions without active leases can be evicted; otherwise allow a temporary overshoot
+        idle = [(entry.last_used, key) for key, entry in self._entries.items() if entry.leases == 0]
+        if not idle:
+            return
+        _, key = min(idle, key=lambda item: item[0])
+        entry = self._entries.pop(key)
+        if not entry.session.closed:
+            await entry.session.close()
+
+    async def close_all(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await asyncio.gather(
+            *(entry.session.close() for entry in entries if not entry.session.closed),
+            return_exceptions=True
+        )
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,413 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from multiprocessing.connection import wait as wait_connections
+
+FLUSH_INTERVAL = 0.5  # seconds between stat deltas sent by a worker
+
+def shard_of(key, workers: int) -> int:
+    """Stable shard for a (user_id, proxy) pair.
+
+    Pairs are grouped by proxy so one worker owns every uid on a proxy and
+    its shared session and circuit breaker stay in a single process.
+    """
+    user_id, proxy = key
+    return zlib.crc32((proxy or user_id).encode()) % workers
+
+def split_shards(pairs, workers: int) -> list:
+    shards = [[] for _ in range(workers)]
+    for key in pairs:
+        shards[shard_of(key, workers)].append(key)
+    return shards
+
+class ShardReporter:
+    """Worker-side stand-in for DisplayManager that batches stat deltas for the coordinator."""
+
+    def __init__(self, activity_size: int = 30):
+        self.is_running = True
+        self.pings = 0
+        self.failed = 0
+        self.proxy_counts = {}  # proxy -> [success, total]
+        self.errors = {}  # (proxy, message) -> count
+        self.activity = deque(maxlen=activity_size)
+        self.used = []
+        self.crashes = 0
+        self.lost = 0
+        self.opened = 0
+        self.closed = 0
+        self.handshakes = []  # (seconds, resumed)
+        self.reconnects = 0
+        self.attempts = []  # (proxy, host, phases, error, unix time)
+        self.traffic = {}  # (proxy, account, category) -> [sent, received]
+        self.health = None  # ProxyHealth.export(), set by the worker when due
+        self.load = None  # (loop lag, shedding level, connections paused), set by the worker on change
+
+    def add_activity(self, activity_data: dict):
+        self.activity.append(activity_data)
+
+    def add_error(self, error_message: str, proxy: str = None, count: int = 1):
+        key = (proxy, error_message)
+        self.errors[key] = self.errors.get(key, 0) + count
+
+    def record_task_crash(self, error_message: str, proxy: str = None):
+        self.crashes += 1
+        self.add_error(error_message, proxy)
+
+    def record_lost_connections(self, count: int, error_message: str, proxy: str = None):
+        self.lost += count
+        self.add_error(error_message, proxy)
+
+    def update_stats(self, success: bool, proxy: str):
+        self.pings += 1
+        if not success:
+            self.failed += 1
+        counts = self.proxy_counts.get(proxy)
+        if counts is None:
+            counts = self.proxy_counts[proxy] = [0, 0]
+        counts[1] += 1
+        if success:
+            counts[0] += 1
+
+    def add_used_proxy(self, proxy: str):
+        self.used.append(proxy)
+
+    def expect_connections(self, count: int):
+        pass  # The coordinator knows the fleet-wide total
+
+    def connection_opened(self, count: int = 1):
+        self.opened += count
+
+    def connection_closed(self, count: int = 1):
+        self.closed += count
+
+    def record_handshake(self, seconds: float, resumed: bool = None):
+        self.handshakes.append((seconds, resumed))
+
+    def record_reconnect(self):
+        self.reconnects += 1
+
+    def record_connection_phases(self, proxy: str, host: str, phases: dict, error: str = None):
+        self.attempts.append((proxy, host, phases, error, time.time()))
+
+    def record_bytes(self, proxy: str, account: str, category: str, sent: int, received: int):
+        key = (proxy, account, category)
+        counts = self.traffic.get(key)
+        if counts is None:
+            counts = self.traffic[key] = [0, 0]
+        counts[0] += sent
+        counts[1] += received
+
+    def set_shedding_level(self, level: int):
+        pass  # The worker loop reports the level together with its loop lag
+
+    def update_display(self, live):
+        pass
+
+    def take_delta(self):
+        """Return the compact delta since the last call, or None if nothing changed."""
+        if not (self.pings or self.errors or self.activity or self.used or self.crashes or self.lost
+                or self.opened or self.closed or self.handshakes or self.reconnects or self.attempts
+                or self.traffic or self.health is not None or self.load is not None):
+            return None
+        activity = [
+            (a['time'].timestamp(), a.get('success', False), a.get('message', ''), a.get('status', ''))
+            for a in self.activity
+        ]
+        delta = (
+            self.pings, self.failed, self.proxy_counts, self.errors,
+            activity, self.used, self.crashes, self.lost, self.opened, self.closed,
+            self.handshakes, self.reconnects, self.attempts, self.traffic, self.health, self.load
+        )
+        self.pings = self.failed = self.crashes = self.lost = self.opened = self.closed = self.reconnects = 0
+        self.handshakes = []
+        self.attempts = []
+        self.traffic = {}
+        self.health = None
+        self.load = None
+        self.proxy_counts = {}
+        self.errors = {}
+        self.activity.clear()
+        self.used = []
+        return delta
+
+def apply_delta(display, delta):
+    """Merge one worker delta into the coordinator's DisplayManager."""
+    (pings, failed, proxy_counts, errors, activity, used, crashes, lost,
+     opened, closed, handshakes, reconnects, attempts, traffic, _, _) = delta
+    stats = display.stats
+    stats.total_pings += pings
+    stats.failed_pings += failed
+    for proxy, (success, total) in proxy_counts.items():
+        stats.merge(proxy, success, total)
+    for proxy in used:
+        display.add_used_proxy(proxy)
+    stats.task_crashes += crashes
+    stats.lost_connections += lost
+    stats.reconnects += reconnects
+    for seconds, resumed in handshakes:
+        display.record_handshake(seconds, resumed)
+    for proxy, host, phases, error, at in attempts:
+        display.record_connection_phases(proxy, host, phases, error, at)
+    for (proxy, account, category), (sent, received) in traffic.items():
+        display.record_bytes(proxy, account, category, sent, received)
+    if opened:
+        display.connection_opened(opened)
+    if closed:
+        display.connection_closed(closed)
+    for timestamp, success, message, status in activity:
+        display.add_activity({
+            'time': datetime.fromtimestamp(timestamp),
+            'success': success,
+            'message': message,
+            'status': status
+        })
+    for (proxy, message), count in errors.items():
+        display.add_error(message, proxy, count)
+    display.mark_dirty("metrics", "proxies")
+
+async def _worker_main(pairs, conn, health, profile):
+    from .bot import Bot
+    from .config import Config
+    from .supervisor import TaskSupervisor, RestartPolicy
+    from .shutdown import graceful_shutdown, install_signal_handlers
+
+    install_signal_handlers()
+    profile.apply(asyncio.get_running_loop())
+
+    config = Config()
+    reporter = ShardReporter()
+    bot = Bot(config, reporter)
+    profile.install_profiler(lambda message: reporter.add_activity({
+        'time': datetime.now(),
+        'success': True,
+        'message': f'Worker {os.getpid()}: {message}',
+        'status': 'Profiling'
+    }))
+    bot.proxy_health.restore(health)
+
+    def on_task_crash(key, exception, crash_count):
+        user_id, proxy = key
+        reporter.record_task_crash(f"Task failed ({crash_count}x) for {proxy or 'direct'}: {str(exception)}", proxy)
+
+    def on_task_give_up(key, exception, crash_count):
+        user_id, proxy = key
+        reporter.record_lost_connections(
+            1, f"Gave up on {proxy or 'direct'} after {crash_count} crashes: {str(exception)}", proxy
+        )
+
+    supervisor = TaskSupervisor(
+        RestartPolicy(mode='on-failure', delay=config.task_restart_delay),
+        on_crash=on_task_crash,
+        on_give_up=on_task_give_up
+    )
+    for key in pairs:
+        supervisor.start(key, bot.connection_factory(key))
+
+    health_due = time.monotonic() + config.proxy_state_interval
+    last_load = None
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            if time.monotonic() >= health_due:
+                # The coordinator keeps the latest breaker states for its proxy state snapshot
+                reporter.health = bot.proxy_health.export()
+                health_due = time.monotonic() + config.proxy_state_interval
+            load = (round(bot.loop_monitor.lag, 3), bot.shedder.level, bot.shedder.paused)
+            if load != last_load:
+                reporter.load = last_load = load
+            delta = reporter.take_delta()
+            if delta:
+                conn.send(delta)
+            if conn.poll() and conn.recv() == 'stop':
+                break
+    except (EOFError, BrokenPipeError):
+        pass  # Coordinator went away
+    except asyncio.CancelledError:
+        pass  # Signalled directly, e.g. SIGTERM to the whole service
+    finally:
+        reporter.is_running = False
+        await graceful_shutdown(bot, supervisor, config.shutdown_timeout)
+        reporter.health = bot.proxy_health.export()
+        try:
+            conn.send(reporter.take_delta())
+        except (BrokenPipeError, OSError):
+            pass
+
+def run_worker(pairs, conn, log_to_stderr: bool = False, health: dict = None, profile=None):
+    """Process entry point: run one shard of (user_id, proxy) pairs on its own event loop."""
+    if log_to_stderr:
+        # Headless parent owns stdout for its JSON-lines stats
+        sys.stdout = sys.stderr
+    try:
+        asyncio.run(_worker_main(pairs, conn, health or {}, profile))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+class ShardCoordinator:
+    """Spawns one worker process per shard and feeds their deltas into a DisplayManager.
+
+    A worker that dies is noticed by its pipe closing: its open connections
+    are counted as closed and it is started again with the same shard, up to
+    max_restarts times. After that its connections are reported as lost.
+    """
+
+    def __init__(self, display, workers: int, profile, log_to_stderr: bool = False, max_restarts: int = 3):
+        self.display = display
+        self.workers = workers
+        self.profile = profile  # RuntimeProfile every worker applies to its own loop
+        self.log_to_stderr = log_to_stderr
+        self.max_restarts = max_restarts
+        self._processes = []
+        self._connections = []
+        self._shards = []  # worker index -> its (user_id, proxy) pairs
+        self._open = []  # worker index -> connections it reported open
+        self._restarts = []  # worker index -> times it was started again
+        self._reader = None
+        self._closing = False
+        self._stopping = threading.Event()
+        self._health = {}  # worker connection -> its last ProxyHealth.export()
+        self._load = {}  # worker index -> (loop lag, shedding level, connections paused)
+
+    def start(self, pairs, health: dict = None):
+        """Start the workers; health holds breaker states to restore, handed to the shard owning each proxy."""
+        health = health or {}
+        for shard in split_shards(pairs, self.workers):
+            if not shard:
+                continue
+            self._shards.append(shard)
+            self._open.append(0)
+            self._restarts.append(0)
+            self._processes.append(None)
+            self._connections.append(None)
+            self._spawn(len(self._shards) - 1, {proxy: health[proxy] for _, proxy in shard if proxy in health})
+
+        loop = asyncio.get_running_loop()
+        self._reader = threading.Thread(target=self._read_loop, args=(loop,), daemon=True)
+        self._reader.start()
+        return len(self._processes)
+
+    def _spawn(self, index: int, health: dict):
+        ctx = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(
+            target=run_worker,
+            args=(self._shards[index], child_conn, self.log_to_stderr, health, self.profile),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self._processes[index] = process
+        self._connections[index] = parent_conn
+
+    def _read_loop(self, loop):
+        # Blocking pipe reads stay on this thread; deltas are applied on the event loop
+        closed = set()
+        while not self._stopping.is_set():
+            # Restarted workers replace their slot in _connections from the loop
+            connections = [conn for conn in self._connections if conn is not None and conn not in closed]
+            if not connections:
+                time.sleep(0.5)
+                continue
+            for conn in wait_connections(connections, timeout=1):
+                try:
+                    delta = conn.recv()
+                except (EOFError, OSError):
+                    closed.add(conn)
+                    if conn in self._connections:
+                        # Reap it here so its exit code is known without blocking the loop
+                        self._processes[self._connections.index(conn)].join(2)
+                    loop.call_soon_threadsafe(self._worker_exited, conn)
+                    continue
+                loop.call_soon_threadsafe(self._apply, conn, delta)
+
+    def _apply(self, conn, delta):
+        if conn not in self._connections:
+            return  # Straggler from a worker that was already replaced
+        index = self._connections.index(conn)
+        health, load = delta[-2:]
+        if health is not None:
+            self._health[conn] = health
+        if load is not None:
+            self._load[index] = load
+            self.display.shedding_level = max(level for _, level, _ in self._load.values())
+        opened, closed = delta[8:10]  # See ShardReporter.take_delta
+        self._open[index] += opened - closed
+        apply_delta(self.display, delta)
+
+    def _worker_exited(self, conn):
+        if self._closing or conn not in self._connections:
+            return
+        index = self._connections.index(conn)
+        process = self._processes[index]
+        shard = self._shards[index]
+        # Its sockets died with it without ever being reported closed
+        if self._open[index]:
+            self.display.connection_closed(self._open[index])
+            self._open[index] = 0
+        self._load.pop(index, None)
+        health = self._health.pop(conn, {})
+
+        if self._restarts[index] < self.max_restarts:
+            self._restarts[index] += 1
+            self._spawn(index, health)
+            self.display.add_error(
+                f"Worker {process.pid} exited with code {process.exitcode}; restarted it for its "
+                f"{len(shard)} connections ({self._restarts[index]}/{self.max_restarts})"
+            )
+        else:
+            self._connections[index] = None
+            routes = dict.fromkeys(self.display.proxy_identity(proxy) for _, proxy in shard)
+            self.display.record_lost_connections(
+                len(shard),
+                f"Worker {process.pid} exited with code {process.exitcode} after {self.max_restarts} restarts; "
+                f"dropped {len(shard)} connections on {', '.join(routes)}"
+            )
+
+    def load_states(self) -> dict:
+        """(loop lag, shedding level, connections paused) last reported by each worker."""
+        return dict(self._load)
+
+    def health_states(self) -> dict:
+        """Breaker states last reported by every worker; shards own disjoint proxies."""
+        states = {}
+        for health in self._health.values():
+            states.update(health)
+        return states
+
+    def signal_workers(self, sig: int):
+        for process in self._processes:
+            if process.is_alive():
+                try:
+                    os.kill(process.pid, sig)
+                except OSError:
+                    pass
+
+    @property
+    def alive(self) -> int:
+        return sum(1 for process in self._processes if process.is_alive())
+
+    async def stop(self, timeout: float = 15):
+        self._closing = True
+        for conn in self._connections:
+            if conn is None:
+                continue
+            try:
+                conn.send('stop')
+            except (BrokenPipeError, OSError):
+                pass
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            await asyncio.to_thread(process.join, max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._stopping.set()
+        if self._reader:
+            await asyncio.to_thread(self._reader.join, 2)
@@ -0,0 +1,55 @@
+import asyncio
+import signal
+
+def install_signal_handlers():
+    """Turn SIGINT/SIGTERM into one cancel of the current task so its shutdown drain runs.
+
+    The drain is bounded by its own deadline, so repeated signals are ignored.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    signalled = []
+
+    def stop():
+        if not signalled:
+            signalled.append(True)
+            task.cancel()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on Windows; KeyboardInterrupt still applies there
+
+async def graceful_shutdown(bot, supervisor, timeout: float = 10) -> dict:
+    """Drain a running Bot under one global deadline.
+
+    Restarts and reconnects stop first, so a loop whose socket is closed
+    parks instead of opening a new one. Then every socket gets its close
+    frame at the same time and sockets still closing when their share of
+    the budget runs out are aborted. The connection tasks are cancelled next and the helpers and
+    shared sessions close concurrently. Caches are flushed last regardless.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+
+    def remaining() -> float:
+        return max(0.0, deadline - loop.time())
+
+    supervisor.close()
+    bot.reconnects.stop()
+    closed, aborted = await bot.close_sockets(remaining() * 0.6)
+    stuck = await supervisor.cancel_all(remaining() * 0.5)
+    try:
+        await asyncio.wait_for(bot.close(), max(remaining(), 0.1))
+    except asyncio.TimeoutError:
+        pass
+    bot.flush()
+
+    return {
+        'closed': closed,
+        'aborted': aborted,
+        'stuck_tasks': stuck,
+        'seconds': round(loop.time() - started, 2)
+    }
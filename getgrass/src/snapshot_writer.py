@@ -0,0 +1,38 @@
+import asyncio
+import json
+import sys
+
+class SnapshotWriter:
+    """Headless stand-in for the Live view: one compact JSON line of display stats per interval."""
+
+    def __init__(self, display, output: str = '-', interval: float = 10):
+        self.display = display
+        self.output = output
+        self.interval = interval
+        # Always the real stdout; headless mode moves regular prints to stderr
+        self._stream = sys.__stdout__ if output == '-' else None
+
+    def _open(self):
+        if self._stream is None:
+            self._stream = open(self.output, 'a', encoding='utf-8', buffering=1)
+        return self._stream
+
+    def write_snapshot(self):
+        try:
+            stream = self._open()
+            stream.write(json.dumps(self.display.snapshot(), separators=(',', ':')) + '\n')
+            stream.flush()
+        except OSError as e:
+            print(f"Failed to write stats snapshot: {str(e)}", file=sys.stderr)
+
+    async def run(self):
+        while self.display.is_running:
+            await asyncio.sleep(self.interval)
+            self.write_snapshot()
+
+    def stop(self):
+        # Final snapshot so short runs and shutdowns are still recorded
+        self.write_snapshot()
+        if self._stream is not None and self.output != '-':
+            self._stream.close()
+            self._stream = None
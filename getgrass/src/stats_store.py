@@ -0,0 +1,223 @@
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+
+# Ranking groups, in display order
+INACTIVE, POOR, ACTIVE = 0, 1, 2
+
+class Histogram:
+    """Fixed-bucket latency histogram in seconds; bucket counts merge across processes."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.counts = array('q', [0] * (len(self.buckets) + 1))  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket; the +Inf bucket reports its lower bound."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """(buckets, per-bucket counts, sum, count) copied for off-loop rendering."""
+        return self.buckets, self.counts.tolist(), self.sum, self.count
+
+class StatsStore:
+    """Compact telemetry shared by the display and exporters.
+
+    Proxies are interned to integer ids, counters live in array-backed
+    columns and the ranking is kept sorted incrementally on every update,
+    so reading the top rows costs the same regardless of fleet size.
+    """
+
+    def __init__(self, activity_size: int = 30, poor_threshold: float = 0.5):
+        self.poor_threshold = poor_threshold
+        self.activity = deque(maxlen=activity_size)
+        self.total_pings = 0
+        self.failed_pings = 0
+        self.last_success = None
+        self.task_crashes = 0
+        self.lost_connections = 0  # connections nothing will restart, e.g. given up after repeated crashes
+
+        self.active_connections = 0
+        self.expected_connections = 0
+        self.ramp_started = None
+        self.fully_connected_after = None  # seconds from the first expected count to all connections up
+        self.reconnects = 0
+        self.handshake_time = Histogram()
+        self.tls_resumed = 0  # TLS handshakes that resumed a cached session
+        self.tls_full = 0
+
+        self.names = []  # id -> normalized proxy
+        self.success = array('q')
+        self.total = array('q')
+        self._ids = {}  # normalized proxy -> id
+        self._raw_ids = {}  # raw proxy string -> id, skips re-normalizing
+        self._used = set()
+
+        self._keys = []  # id -> current ranking key
+        self._ranking = []  # sorted ranking keys
+        self.group_counts = [0, 0, 0]
+
+    @staticmethod
+    def normalize_proxy(proxy: str) -> str:
+        """Normalize proxy string to consistent format."""
+        if not proxy:
+            return proxy
+        # Extract just the host:port if it's a full URL
+        if '@' in proxy:
+            return proxy.split('@')[-1].split(':')[0]
+        return proxy.split(':')[0]
+
+    @staticmethod
+    def proxy_identity(proxy: str) -> str:
+        """scheme://user@host:port of a proxy line with the password left out.
+
+        Unlike normalize_proxy this tells apart proxies that share a host.
+        """
+        if not proxy:
+            return proxy
+        scheme, sep, address = proxy.strip().rpartition('://')
+        auth, at, host = address.rpartition('@')
+        user = auth.split(':', 1)[0]
+        return f"{scheme}{sep}{user}{at}{host}"
+
+    def intern(self, proxy: str) -> int:
+        proxy_id = self._raw_ids.get(proxy)
+        if proxy_id is not None:
+            return proxy_id
+
+        name = self.normalize_proxy(proxy)
+        proxy_id = self._ids.get(name)
+        if proxy_id is None:
+            proxy_id = len(self.names)
+            self._ids[name] = proxy_id
+            self.names.append(name)
+            self.success.append(0)
+            self.total.append(0)
+            self._keys.append(None)
+        self._raw_ids[proxy] = proxy_id
+        return proxy_id
+
+    def _group(self, proxy_id: int) -> int:
+        total = self.total[proxy_id]
+        if total == 0:
+            return INACTIVE
+        return POOR if self.success[proxy_id] / total < self.poor_threshold else ACTIVE
+
+    def _rerank(self, proxy_id: int):
+        old_key = self._keys[proxy_id]
+        if old_key is not None:
+            del self._ranking[bisect_left(self._ranking, old_key)]
+            self.group_counts[old_key[0]] -= 1
+
+        total = self.total[proxy_id]
+        rate = self.success[proxy_id] / total if total else 0.0
+        group = self._group(proxy_id)
+        new_key = (group, -rate, proxy_id)
+        insort(self._ranking, new_key)
+        self._keys[proxy_id] = new_key
+        self.group_counts[group] += 1
+
+    def mark_used(self, proxy: str) -> bool:
+        """Track a proxy as in use; returns True the first time it is seen."""
+        proxy_id = self.intern(proxy)
+        if proxy_id in self._used:
+            return False
+        self._used.add(proxy_id)
+        if self._keys[proxy_id] is None:
+            self._rerank(proxy_id)
+        return True
+
+    def record(self, proxy: str, success: bool):
+        if not proxy:
+            return
+        proxy_id = self.intern(proxy)
+        self.total[proxy_id] += 1
+        if success:
+            self.success[proxy_id] += 1
+        self._rerank(proxy_id)
+
+    def merge(self, proxy: str, success: int, total: int):
+        """Add pre-aggregated counters, e.g. a delta from a worker process."""
+        if not proxy or not total:
+            return
+        proxy_id = self.intern(proxy)
+        self.total[proxy_id] += total
+        self.success[proxy_id] += success
+        self._rerank(proxy_id)
+
+    def record_ping(self, success: bool, proxy: str = None):
+        self.total_pings += 1
+        if not success:
+            self.failed_pings += 1
+        self.record(proxy, success)
+
+    def record_error(self, proxy: str = None, count: int = 1):
+        self.failed_pings += count
+        if proxy:
+            proxy_id = self.intern(proxy)
+            self.total[proxy_id] += count
+            self._rerank(proxy_id)
+
+    def expect_connections(self, count: int):
+        self.expected_connections = count
+        if self.ramp_started is None:
+            self.ramp_started = time.monotonic()
+
+    def connection_opened(self, count: int = 1) -> bool:
+        """Count open connections; returns True when the fleet first becomes fully connected."""
+        self.active_connections += count
+        if (self.fully_connected_after is None and self.expected_connections
+                and self.active_connections >= self.expected_connections):
+            self.fully_connected_after = time.monotonic() - (self.ramp_started or time.monotonic())
+            return True
+        return False
+
+    def connection_closed(self, count: int = 1):
+        self.active_connections = max(0, self.active_connections - count)
+
+    def add_activity(self, activity_data: dict):
+        self.activity.append(activity_data)
+        if activity_data.get('success', False):
+            self.last_success = activity_data['time']
+
+    @property
+    def used_count(self) -> int:
+        return len(self._used)
+
+    @property
+    def proxy_count(self) -> int:
+        return len(self._ranking)
+
+    def ranked(self, limit: int = None):
+        """Yield (proxy, success, total, group) in display order."""
+        keys = self._ranking if limit is None else self._ranking[:limit]
+        for group, _, proxy_id in keys:
+            yield self.names[proxy_id], self.success[proxy_id], self.total[proxy_id], group
+
+    def proxy_snapshot(self) -> dict:
+        """Plain per-proxy counters for exporters."""
+        return {
+            self.names[proxy_id]: {'success': self.success[proxy_id], 'total': self.total[proxy_id]}
+            for _, _, proxy_id in self._ranking
+        }
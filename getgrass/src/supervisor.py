@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+class RestartPolicy:
+    """When and how fast the supervisor restarts a finished task.
+
+    mode is 'always', 'on-failure' or 'never'. A task that crashes more than
+    max_restarts times within window seconds is given up on, and the
+    supervisor's on_give_up hook is told.
+    """
+
+    def __init__(self, mode: str = 'on-failure', delay: float = 5.0,
+                 max_restarts: int = 10, window: float = 300.0):
+        if mode not in ('always', 'on-failure', 'never'):
+            raise ValueError(f"Unknown restart mode: {mode}")
+        self.mode = mode
+        self.delay = delay
+        self.max_restarts = max_restarts
+        self.window = window
+
+    def should_restart(self, failed: bool) -> bool:
+        if self.mode == 'always':
+            return True
+        return failed and self.mode == 'on-failure'
+
+class TaskSupervisor:
+    """Owns the connection tasks keyed by (uid, proxy) and restarts them per policy.
+
+    Completion is handled by task done-callbacks, so bookkeeping is O(1) per
+    event and nothing polls the task set.
+    """
+
+    def __init__(self, policy: RestartPolicy = None, on_crash=None, on_give_up=None):
+        self.policy = policy or RestartPolicy()
+        self.on_crash = on_crash  # called as on_crash(key, exception, crash_count)
+        self.on_give_up = on_give_up  # called as on_give_up(key, exception, crash_count) when restarts stop
+        self.tasks = {}  # key -> Task
+        self._factories = {}  # key -> zero-argument coroutine factory
+        self.crash_counts = {}  # key -> total crashes
+        self._recent_crashes = {}  # key -> (window start, crashes in window)
+        self._pending_restarts = {}  # key -> TimerHandle
+        self.total_restarts = 0
+        self.total_crashes = 0
+        self.given_up = 0
+        self._closing = False
+        self._closed = asyncio.Event()
+
+    @property
+    def running(self) -> int:
+        return len(self.tasks)
+
+    def start(self, key, factory):
+        """Start a supervised task for key; factory() must return a fresh coroutine."""
+        if self._closing or key in self.tasks:
+            return
+        self._factories[key] = factory
+        self._spawn(key)
+
+    def _spawn(self, key):
+        self._pending_restarts.pop(key, None)
+        factory = self._factories.get(key)
+        if self._closing or factory is None:
+            return
+        task = asyncio.create_task(factory())
+        self.tasks[key] = task
+        task.add_done_callback(lambda t, key=key: self._on_done(key, t))
+
+    def _on_done(self, key, task: asyncio.Task):
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+        if task.cancelled() or self._closing:
+            return
+
+        exception = task.exception()
+        failed = exception is not None
+        if failed:
+            count = self.crash_counts.get(key, 0) + 1
+            self.crash_counts[key] = count
+            self.total_crashes += 1
+            if self.on_crash:
+                self.on_crash(key, exception, count)
+
+            now = time.monotonic()
+            window_start, recent = self._recent_crashes.get(key, (now, 0))
+            if now - window_start > self.policy.window:
+                window_start, recent = now, 0
+            recent += 1
+            self._recent_crashes[key] = (window_start, recent)
+            if recent > self.policy.max_restarts:
+                self._factories.pop(key, None)
+                self.given_up += 1
+                if self.on_give_up:
+                    self.on_give_up(key, exception, count)
+                return
+
+        if not self.policy.should_restart(failed):
+            self._factories.pop(key, None)
+            return
+
+        self.total_restarts += 1
+        loop = asyncio.get_running_loop()
+        self._pending_restarts[key] = loop.call_later(self.policy.delay, self._spawn, key)
+
+    def stop(self, key) -> asyncio.Task:
+        """Stop supervising key and cancel its task; returns the task, if any."""
+        self._factories.pop(key, None)
+        handle = self._pending_restarts.pop(key, None)
+        if handle:
+            handle.cancel()
+        task = self.tasks.pop(key, None)
+        if task:
+            task.cancel()
+        return task
+
+    def close(self):
+        """Stop restarting and wake anything waiting on wait_closed()."""
+        self._closing = True
+        for handle in self._pending_restarts.values():
+            handle.cancel()
+        self._pending_restarts.clear()
+        self._closed.set()
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    async def cancel_all(self, timeout: float = None) -> int:
+        """Cancel every task and wait up to timeout; returns how many were still running."""
+        self.close()
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        if not tasks:
+            return 0
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in done:
+            if not task.cancelled():
+                task.exception()  # Retrieved so asyncio does not warn about it
+        return len(pending)
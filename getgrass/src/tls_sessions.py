@@ -0,0 +1,54 @@
+import ssl
+import time
+from .phase_timing import current_attempt
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client SSL context that resumes TLS sessions per endpoint.
+
+    Endpoints are host:port, as in Config.wss_list: several of them can share
+    a hostname and each keeps its own session. wrap_bio takes the endpoint
+    from the current ConnectionAttempt and falls back to the bare hostname.
+
+    asyncio wraps every TLS connection through wrap_bio, for direct sockets and
+    for start_tls over a SOCKS tunnel alike, so offering the cached session
+    there covers every path. Sessions are fed back with record() once the
+    WebSocket upgrade is done, by which time the server's ticket has arrived.
+    """
+
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        # SSLContext takes the protocol in __new__, not __init__
+        return super().__new__(cls, protocol)
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        self._sessions = {}  # endpoint -> SSLSession
+        self.resumed = {}  # endpoint -> handshakes that resumed
+        self.full = {}  # endpoint -> full handshakes
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        attempt = current_attempt()
+        if session is None and not server_side:
+            endpoint = attempt.host if attempt is not None and attempt.host else server_hostname
+            session = self._session_for(endpoint)
+        if attempt is not None:
+            attempt.tls_started()
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+    def _session_for(self, endpoint: str):
+        session = self._sessions.get(endpoint)
+        if session is not None and time.time() >= session.time + session.timeout:
+            # Past the server's lifetime hint; offering it would only cost a full handshake anyway
+            del self._sessions[endpoint]
+            return None
+        return session
+
+    def record(self, ssl_object: ssl.SSLObject, endpoint: str = None) -> bool:
+        """Count a finished handshake and keep its session for the next one to the same endpoint."""
+        endpoint = endpoint or ssl_object.server_hostname
+        resumed = ssl_object.session_reused
+        counts = self.resumed if resumed else self.full
+        counts[endpoint] = counts.get(endpoint, 0) + 1
+
+        session = ssl_object.session
+        if session is not None and (session.has_ticket or session.id):
+            self._sessions[endpoint] = session
+        return resumed